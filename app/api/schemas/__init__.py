@@ -1,3 +1,3 @@
-from .pagination import PaginationResponse
+from .pagination import PaginationResponse, PaginatedJSONResponse
 
-__all__ = ["PaginationResponse"]
\ No newline at end of file
+__all__ = ["PaginationResponse", "PaginatedJSONResponse"]
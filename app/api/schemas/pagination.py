@@ -1,5 +1,7 @@
 from pydantic import BaseModel
-from typing import List, TypeVar, Generic
+from fastapi.responses import ORJSONResponse
+from typing import Any, Dict, List, Optional, TypeVar, Generic
+import orjson
 
 T = TypeVar('T')
 
@@ -12,10 +14,25 @@ class PaginationResponse(BaseModel, Generic[T]):
         "list": [...],     # Array of items
         "total": 299,      # Total number of items
         "page": 1,         # Current page number
-        "limit": 10        # Items per page limit
+        "limit": 10,       # Items per page limit
+        "next_cursor": ... # Optional cursor for the next page (keyset pagination)
     }
     """
     list: List[T]
     total: int
     page: int
-    limit: int
\ No newline at end of file
+    limit: int
+    next_cursor: Optional[str] = None
+
+class PaginatedJSONResponse(ORJSONResponse):
+    """
+    Sends a page the service has already built in PaginationResponse shape.
+
+    Returning it from a route skips FastAPI's per-item validation against
+    response_model and the jsonable_encoder pass; anything orjson cannot
+    encode natively (e.g. a nested ObjectId) is sent as its str().
+    """
+    def render(self, content: Dict[str, Any]) -> bytes:
+        # Same keys as PaginationResponse, which defaults next_cursor to None
+        content.setdefault("next_cursor", None)
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
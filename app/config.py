@@ -13,6 +13,16 @@ class Settings(BaseSettings):
     # ตั้งค่า MongoDB
     MONGODB_URI: str = "mongodb://localhost:27017"
     MONGODB_DB: str = "csv2json"
+    # Connections kept open while idle; keep low so short-lived instances do
+    # not open idle connections at startup (raise through env if needed)
+    MONGODB_MIN_POOL_SIZE: int = 1
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 10000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    # Aggregations/full reads allowed at once; kept below the pool size so
+    # short queries still get a connection during a spike
+    MONGODB_MAX_CONCURRENT_QUERIES: int = 80
     
     # JWT settings
     JWT_SECRET_KEY: str = "fallback-secret-key"
@@ -39,6 +49,32 @@ class Settings(BaseSettings):
 
     #FRONT END
     FRONTEND_URL: str = ""
+
+    # Cache
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_SIZE: int = 1024
+    TASK_CACHE_TTL_SECONDS: int = 60
+    TASK_CACHE_MAX_SIZE: int = 1024
+    # Task list pages are served from cache for up to TTL seconds, refreshed
+    # in the background once they are older than FRESH seconds
+    TASK_LIST_CACHE_TTL_SECONDS: int = 30
+    TASK_LIST_CACHE_FRESH_SECONDS: int = 5
+
+    # Password hashing (BCRYPT_TARGET_MS > 0 calibrates the rounds at startup).
+    # PASSWORD_HASH_SCHEME="argon2" hashes new passwords with argon2id and
+    # upgrades bcrypt hashes on login (requires argon2-cffi)
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    BCRYPT_TARGET_MS: int = 0
+
+    # Successful password checks remembered so repeats skip bcrypt (0 disables)
+    PASSWORD_CACHE_TTL_SECONDS: int = 300
+    PASSWORD_CACHE_MAX_SIZE: int = 2048
+
+    # Decoded access tokens remembered so repeats skip the signature check
+    # (0 disables); an entry never outlives the token's own exp
+    TOKEN_CACHE_TTL_SECONDS: int = 60
+    TOKEN_CACHE_MAX_SIZE: int = 4096
     
     class Config:
         # อ่านไฟล์ .env ตาม environment
@@ -53,6 +89,12 @@ def get_settings() -> Settings:
         env_vars: List[str] = [
             "MONGODB_URI",
             "MONGODB_DB",
+            "MONGODB_MIN_POOL_SIZE",
+            "MONGODB_MAX_POOL_SIZE",
+            "MONGODB_MAX_IDLE_TIME_MS",
+            "MONGODB_WAIT_QUEUE_TIMEOUT_MS",
+            "MONGODB_SERVER_SELECTION_TIMEOUT_MS",
+            "MONGODB_MAX_CONCURRENT_QUERIES",
             "JWT_SECRET_KEY",
             "JWT_ALGORITHM",
             "JWT_ACCESS_TOKEN_EXPIRE_MINUTES",
@@ -68,7 +110,20 @@ def get_settings() -> Settings:
             "SMTP_FROM_EMAIL",
             "SMTP_FROM_NAME",
             "SMTP_USE_TLS",
-            "FRONTEND_URL"
+            "FRONTEND_URL",
+            "USER_CACHE_TTL_SECONDS",
+            "USER_CACHE_MAX_SIZE",
+            "TASK_CACHE_TTL_SECONDS",
+            "TASK_CACHE_MAX_SIZE",
+            "TASK_LIST_CACHE_TTL_SECONDS",
+            "TASK_LIST_CACHE_FRESH_SECONDS",
+            "PASSWORD_HASH_SCHEME",
+            "BCRYPT_ROUNDS",
+            "BCRYPT_TARGET_MS",
+            "PASSWORD_CACHE_TTL_SECONDS",
+            "PASSWORD_CACHE_MAX_SIZE",
+            "TOKEN_CACHE_TTL_SECONDS",
+            "TOKEN_CACHE_MAX_SIZE"
         ]
         for var in env_vars:
             os.environ.pop(var, None)
@@ -1,6 +1,7 @@
 from app.config import get_settings
 from motor.motor_asyncio import AsyncIOMotorClient
 from typing import Optional, Dict, Any
+import asyncio
 import logging
 from datetime import datetime
 
@@ -25,44 +26,72 @@ settings = get_settings()
 async def get_client():
     global _client
     if _client is None:
-        # คอนฟิกการเชื่อมต่อ (ปรับตามความเหมาะสม)
+        # คอนฟิกการเชื่อมต่อ (ปรับได้ผ่าน settings / .env)
         _client = AsyncIOMotorClient(
             settings.MONGODB_URI,
-            maxPoolSize=10,
-            minPoolSize=1,
-            maxIdleTimeMS=30000
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            retryWrites=True
         )
     return _client
 
+# จำกัดจำนวน query หนัก (aggregation / อ่านทั้ง collection) ที่รันพร้อมกัน
+# สร้างเมื่อใช้ครั้งแรกเพื่อผูกกับ event loop ที่กำลังทำงาน
+_query_semaphore: Optional[asyncio.Semaphore] = None
+
+def query_slot() -> asyncio.Semaphore:
+    global _query_semaphore
+    if _query_semaphore is None:
+        _query_semaphore = asyncio.Semaphore(settings.MONGODB_MAX_CONCURRENT_QUERIES)
+    return _query_semaphore
+
 async def get_database():
     client = await get_client()
     return client[settings.MONGODB_DB]
-    
+
+# เก็บ collection ที่สร้างแล้วไว้ใช้ซ้ำ ไม่ต้องสร้าง object ใหม่ทุกครั้งที่เรียก
+_collections: Dict[str, Any] = {}
+
 async def get_collection(collection_name: str):
-    db = await get_database()
-    return db[collection_name]
+    collection = _collections.get(collection_name)
+    if collection is None:
+        db = await get_database()
+        collection = db[collection_name]
+        _collections[collection_name] = collection
+    return collection
 
 # เชื่อมต่อ MongoDB และเตรียม collection สำหรับ Entity
 async def initialize_db() -> bool:
     try:
-        client = AsyncIOMotorClient(settings.MONGODB_URI)
+        # ใช้ client ตัวเดียวกับ request และ ping เพื่อเปิด connection ไว้ก่อน request แรก
+        client = await get_client()
+        await client.admin.command("ping")
         db = client[settings.MONGODB_DB]
 
         # สร้างดัชนีสำหรับคอลเลกชัน users
         await db.users.create_index("username", unique=True)
         await db.users.create_index("email", unique=True)
+        await db.users.create_index("email_verification_token", sparse=True)
+        await db.users.create_index("password_reset_token", sparse=True)
         
         # สร้างดัชนีสำหรับคอลเลกชัน files
         await db.files.create_index("filename", unique=True)
         await db.files.create_index("upload_date")
 
+        # สร้างดัชนีสำหรับคอลเลกชัน tasks (รายการงานเรียงจากใหม่ไปเก่า)
+        await db.tasks.create_index([("created_at", -1), ("_id", -1)])
+
         # ตรวจสอบและสร้าง admin user ถ้าไม่มี
         admin_user = await db.users.find_one({"username": "admin"})
         if not admin_user:
             # Import AuthService here to avoid circular import
-            from app.routers.auth.auth_service import AuthService
-            auth_service = AuthService()
+            from app.routers.auth.auth_service import get_auth_service
+            auth_service = get_auth_service()
             
+            now = datetime.now()
             admin_data: Dict[str, Any] = {
                 "username": "admin",
                 "password": auth_service.get_password_hash("ThisIsAdmin"),
@@ -70,8 +99,8 @@ async def initialize_db() -> bool:
                 "first_name": "adminFirstName",
                 "last_name": "adminLastname",
                 "middle_name": "adminMiddleName",
-                "created_at": datetime.now(),
-                "updated_at": datetime.now(),
+                "created_at": now,
+                "updated_at": now,
                 "last_login_ip": None,
                 "login_history": [],
                 "roles": ["admin"]
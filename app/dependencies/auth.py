@@ -1,13 +1,14 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import List, Callable
-from app.routers.auth.auth_service import AuthService
+from app.routers.auth.auth_service import get_auth_service
 from app.routers.auth.auth_model import TokenData, UserRole
+from app.routers.user.user_repository import get_user_repository
 from app.exceptions import UserException
 from app.utils.advanced_performance import tracker
 
 # Initialize services
-auth_service = AuthService()
+auth_service = get_auth_service()
 
 # Security scheme
 security = HTTPBearer()
@@ -24,9 +25,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     return user_data
 
 async def get_current_active_user(current_user: TokenData = Depends(get_current_user)) -> TokenData:
-    from app.routers.user.user_repository import UserRepository
-    user_repository = UserRepository()
-    user = await user_repository.find_by_id(current_user.user_id)
+    user = await get_user_repository().find_by_id(current_user.user_id)
     if not user or not user.get("is_active", True):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -2,9 +2,9 @@
 import pandas as pd
 import logging
 from app.utils.advanced_performance import tracker, TimedBlock
-from typing import Dict, Any, List
-import pprint
+from typing import Dict, Any, Iterator, List, Tuple
 import os
+import sys
 from app.database import get_collection
 import csv
 
@@ -63,9 +63,53 @@ def read_csv_file(file_path: str) -> pd.DataFrame:
         else:
             raise Exception(f"Failed to read CSV file {file_path} with any delimiter")
 
+def detect_csv_delimiter(file_path: str, encoding: str = 'utf-8-sig') -> str:
+    """
+    Detect a CSV file's delimiter the way read_csv_file does, reading only the header
+    """
+    try:
+        # ใช้ csv.Sniffer กับข้อมูลตัวอย่างต้นไฟล์
+        with open(file_path, 'r', encoding=encoding) as file:
+            sample = file.read(1024)
+        return csv.Sniffer().sniff(sample).delimiter
+    except Exception as e:
+        logger.error(f"Sniffer failed, trying manual detection: {str(e)}")
+    
+    # ถ้า Sniffer ล้มเหลว ให้เลือก delimiter ที่ให้ column มากที่สุด
+    best_delimiter = None
+    max_columns = 1
+    for delimiter in [',', ';', '\t', '|']:
+        try:
+            columns = pd.read_csv(file_path, delimiter=delimiter, encoding=encoding, nrows=0).columns
+        except Exception:
+            continue
+        if len(columns) > max_columns:
+            max_columns = len(columns)
+            best_delimiter = delimiter
+    
+    if best_delimiter is None:
+        raise Exception(f"Failed to read CSV file {file_path} with any delimiter")
+    return best_delimiter
+
+def read_csv_in_batches(file_path: str, batch_size: int = 1000) -> Tuple[List[str], Iterator[List[Dict[str, Any]]]]:
+    """
+    Read a CSV file as record batches instead of one DataFrame
+
+    Returns the column names and an iterator of up to batch_size records, so
+    only one batch is held in memory at a time. Values are read as strings:
+    pandas would otherwise infer dtypes per chunk, so a column's type would
+    depend on where the batch boundaries fall. Empty cells stay NaN.
+    """
+    encoding = 'utf-8-sig'
+    delimiter = detect_csv_delimiter(file_path, encoding)
+    logger.info(f"Detected delimiter: '{delimiter}'")
+    
+    columns = pd.read_csv(file_path, delimiter=delimiter, encoding=encoding, nrows=0).columns.tolist()
+    chunks = pd.read_csv(file_path, delimiter=delimiter, encoding=encoding, dtype=str, chunksize=batch_size)
+    return columns, (chunk.to_dict("records") for chunk in chunks)
+
 @tracker.measure_async_time
-async def read_and_save_csv_to_mongodb(file_path: str = "data/sample_100_rows.csv", batch_size: int = 1000) -> Dict[str, Any]:
-    print(f"file_path: {file_path}")
+async def read_and_save_csv_to_mongodb(file_path: str = "data/sample_100_rows.csv", batch_size: int = 5000) -> Dict[str, Any]:
     """
     อ่านไฟล์ CSV และบันทึกข้อมูลลงใน MongoDB collection "csv" แบบแบ่งชุด
     
@@ -90,37 +134,41 @@ async def read_and_save_csv_to_mongodb(file_path: str = "data/sample_100_rows.cs
             csv_collection = await get_collection("csv")
             
             # ล้างข้อมูลเดิมใน collection ก่อนการบันทึกข้อมูลใหม่
-            await csv_collection.delete_many({})
+            # drop เร็วกว่า delete_many ที่ต้องลบทีละเอกสาร (index ของ collection ถูกลบไปด้วย)
+            await csv_collection.drop()
             
-            # ใช้ csv.DictReader อ่านไฟล์แบบ streaming
+            # ใช้ csv.reader อ่านไฟล์แบบ streaming แล้วสร้าง dict จากหัวคอลัมน์เอง
+            # (เร็วกว่า csv.DictReader ที่ต้องตรวจ restkey/restval ทุกแถว)
             total_inserted = 0
             columns = []
             
-            with open(file_path, 'r', encoding='utf-8') as csvfile:
+            with open(file_path, 'r', encoding='utf-8', newline='', buffering=1 << 20) as csvfile:
                 # อ่านหัวข้อคอลัมน์
-                reader = csv.DictReader(csvfile)
-                columns = reader.fieldnames
+                reader = csv.reader(csvfile)
+                columns = [sys.intern(name) for name in next(reader, [])]
                 
                 batch = []
                 
-                # อ่านและประมวลผลข้อมูลทีละแถว
+                # อ่านและประมวลผลข้อมูลทีละแถว (ข้ามบรรทัดว่างเหมือน DictReader)
                 for row in reader:
-                    batch.append(row)
+                    if not row:
+                        continue
+                    batch.append(dict(zip(columns, row)))
                     
                     # เมื่อครบตามขนาด batch ให้บันทึกลง MongoDB
                     if len(batch) >= batch_size:
                         if batch:
-                            pprint.pp(batch[0])
-                            result = await csv_collection.insert_many(batch)
+                            result = await csv_collection.insert_many(batch, ordered=False)
                             total_inserted += len(result.inserted_ids)
                         batch = []
                 
                 # บันทึก batch สุดท้ายที่อาจมีขนาดไม่เต็ม batch_size
                 if batch:
-                    pprint.pp(batch[0])
-                    result = await csv_collection.insert_many(batch)
+                    result = await csv_collection.insert_many(batch, ordered=False)
                     total_inserted += len(result.inserted_ids)
-                    print(f"Inserted final batch: {total_inserted} total records")
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Inserted {total_inserted} records from {file_path} with columns {columns}")
         
         return {
             "success": True,
@@ -129,7 +177,7 @@ async def read_and_save_csv_to_mongodb(file_path: str = "data/sample_100_rows.cs
             "total_rows": total_inserted
         }
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.error(f"Unexpected error: {str(e)}")
         return {
             "success": False,
             "message": f"❌ เกิดข้อผิดพลาดในการอ่านหรือบันทึกข้อมูล: {str(e)}"
@@ -148,16 +196,16 @@ async def clear_csv_collection() -> Dict[str, Any]:
             # เชื่อมต่อกับ collection csv
             csv_collection = await get_collection("csv")
             
-            # ดึงจำนวนเอกสารก่อนที่จะลบ
-            count_before = await csv_collection.count_documents({})
+            # ดึงจำนวนเอกสารก่อนที่จะลบ (จาก metadata ไม่ต้องนับทีละเอกสาร)
+            count_before = await csv_collection.estimated_document_count()
             
-            # ล้างข้อมูลทั้งหมดใน collection
-            result = await csv_collection.delete_many({})
+            # ล้างข้อมูลทั้งหมดด้วยการ drop collection (index ของ collection ถูกลบไปด้วย)
+            await csv_collection.drop()
         
         return {
             "success": True,
-            "message": f"✅ ล้างข้อมูลใน collection csv สำเร็จ จำนวน {result.deleted_count} รายการ",
-            "deleted_count": result.deleted_count,
+            "message": f"✅ ล้างข้อมูลใน collection csv สำเร็จ จำนวน {count_before} รายการ",
+            "deleted_count": count_before,
             "previous_count": count_before
         }
     except Exception as e:
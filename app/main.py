@@ -1,7 +1,8 @@
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from typing import Dict, Any, Callable, Awaitable
+import asyncio
 import os
 import time
 
@@ -47,7 +48,9 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    # ใช้ orjson แปลง response เป็น JSON (เร็วกว่า json มาตรฐาน)
+    default_response_class=ORJSONResponse
 )
 
 # กำหนด allowed origins ตาม environment
@@ -106,6 +109,12 @@ async def get_performance_stats() -> Dict[str, Any]:
 # จัดการ startup event
 @app.on_event("startup")
 async def startup_event() -> None:
+    # ปรับจำนวนรอบของ bcrypt ให้เหมาะกับเครื่องที่รันอยู่ (ถ้าเปิดใช้)
+    if settings.BCRYPT_TARGET_MS > 0:
+        from app.routers.auth.auth_service import get_auth_service
+        rounds = await asyncio.to_thread(get_auth_service().calibrate_password_hashing, settings.BCRYPT_TARGET_MS)
+        print(f"🔐 bcrypt rounds: {rounds} (target {settings.BCRYPT_TARGET_MS} ms)")
+
     # เชื่อมต่อกับ MongoDB
     await initialize_db()
 
@@ -130,8 +139,9 @@ async def shutdown_event() -> None:
     except Exception as e:
         print(f"Error exporting performance data: {e}")
     
-    # ทำความสะอาดทรัพยากรต่างๆ ถ้าจำเป็น
-    pass
+    # ปิดการเชื่อมต่อ SMTP ที่เปิดค้างไว้
+    from app.routers.email.email_service import get_email_service
+    get_email_service().close()
 
 handler = app
 
@@ -1,13 +1,11 @@
-from fastapi import APIRouter, Depends, Request, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, HTTPException
 from typing import Dict, Any
-from app.api.schemas.pagination import PaginationResponse
 from app.routers.auth.auth_model import UserLogin, Token, RefreshTokenRequest
 from app.routers.user.user_model import UserCreate, ChangePasswordRequest
 from app.dependencies.auth import get_current_user, require_admin, require_user
 from app.utils.advanced_performance import tracker
-from app.routers.auth.auth_service import AuthService
-from app.routers.user.user_service import UserService
-import pprint
+from app.routers.auth.auth_service import get_auth_service
+from app.routers.user.user_service import get_user_service
 
 # Create a router instance
 router = APIRouter(
@@ -16,9 +14,9 @@ router = APIRouter(
 )
 
 # Create instance of AuthService
-auth_service = AuthService()
+auth_service = get_auth_service()
 # Create instance of UserService
-user_service = UserService()
+user_service = get_user_service()
 
 @router.post("/login", response_model=Token)
 @tracker.measure_async_time
@@ -44,11 +42,11 @@ async def get_login_history(user_id: str, current_user: Any = Depends(require_ad
 
 @router.post("/register", response_model=dict)
 @tracker.measure_async_time
-async def register(user: UserCreate) -> Dict[str, Any]:
+async def register(user: UserCreate, background_tasks: BackgroundTasks) -> Dict[str, Any]:
     """
     📝 Register new user
     """
-    return await auth_service.register(user)
+    return await auth_service.register(user, background_tasks)
 
 @router.get("/me")
 @tracker.measure_async_time
@@ -135,10 +133,3 @@ async def change_password(user_id: str, password_request: ChangePasswordRequest,
     
     return await user_service.change_password(user_id, password_request, current_user.user_id)
 
-@router.get("/", response_model=PaginationResponse[Dict[str, Any]])
-@tracker.measure_async_time
-async def get_all_users(page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=100), current_user: Any = Depends(require_user)) -> Dict[str, Any]:
-    """
-    📋 ดึงรายการงานทั้งหมด
-    """
-    return await user_service.get_all_users(page, limit)
@@ -1,23 +1,67 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import math
 import os
+import secrets
+import threading
+import time
 import uuid
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, TypeVar
+import bcrypt
+from fastapi import BackgroundTasks
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.routers.auth.auth_model import Token, TokenData, UserLogin, RefreshTokenRequest, RefreshToken, LoginHistory, LoginAttempt, LoginSettings
 from app.routers.user.user_model import UserCreate
 from app.routers.auth.auth_repository import AuthRepository
-from app.routers.user.user_repository import UserRepository
+from app.routers.user.user_repository import UserRepository, get_user_repository
 from app.exceptions import UserException
 from app.config import get_settings, Settings
-from app.utils.performance import measure_time
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+def _argon2_context() -> CryptContext:
+    """
+    Build the argon2id hasher (argon2-cffi is only loaded once it is used)
+
+    bcrypt hashes go straight to the bcrypt C extension; passlib is kept only
+    for argon2, which PASSWORD_HASH_SCHEME="argon2" switches new hashes to.
+    """
+    return CryptContext(
+        schemes=["argon2"],
+        argon2__type="ID", argon2__time_cost=2, argon2__memory_cost=19456, argon2__parallelism=1
+    )
+
+# Per-process key for the password check cache, so its keys reveal nothing
+# about the passwords and cannot be precomputed
+_VERIFY_CACHE_SECRET: bytes = secrets.token_bytes(32)
+
+_T = TypeVar("_T")
+
+# Created lazily so it binds to the running event loop
+_hash_semaphore: Optional[asyncio.Semaphore] = None
+
+async def run_password_hash(func: Callable[..., _T], *args: Any) -> _T:
+    """Run a bcrypt hash/verify in a worker thread, at most one per CPU at a time"""
+    global _hash_semaphore
+    if _hash_semaphore is None:
+        _hash_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+    async with _hash_semaphore:
+        return await asyncio.to_thread(func, *args)
 
 class AuthService:
     def __init__(self) -> None:
         settings: Settings = get_settings()
-        self.user_repository: UserRepository = UserRepository()
+        self.user_repository: UserRepository = get_user_repository()
         self.auth_repository: AuthRepository = AuthRepository()
-        self.pwd_context: CryptContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.password_hash_scheme: str = settings.PASSWORD_HASH_SCHEME
+        self.bcrypt_rounds: int = settings.BCRYPT_ROUNDS
+        self.argon2_context: CryptContext = _argon2_context()
         self.SECRET_KEY: str = settings.JWT_SECRET_KEY
         self.REFRESH_SECRET_KEY: str = settings.JWT_REFRESH_SECRET_KEY
         self.ALGORITHM: str = settings.JWT_ALGORITHM
@@ -28,11 +72,70 @@ class AuthService:
         # In production, this should be replaced with a database storage
         self.refresh_tokens: Dict[str, RefreshToken] = {}
 
+        # verify_password runs in worker threads, so the cache is locked
+        self._verified_cache: TTLCache = TTLCache(
+            maxsize=settings.PASSWORD_CACHE_MAX_SIZE, ttl=settings.PASSWORD_CACHE_TTL_SECONDS
+        )
+        self._verified_lock: threading.Lock = threading.Lock()
+
+        # Decoded access tokens, stored with their exp so an entry never
+        # outlives the token (only touched from the event loop)
+        self._token_cache: TTLCache = TTLCache(
+            maxsize=settings.TOKEN_CACHE_MAX_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS
+        )
+
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return self.pwd_context.verify(plain_password, hashed_password)
+        """
+        Check a password against its bcrypt hash
+
+        Successful checks are remembered under an HMAC of the hash and the
+        password, so repeating one costs a SHA-256 instead of a bcrypt round.
+        A changed password has a new hash and therefore never hits old entries.
+        """
+        key: bytes = hmac.new(
+            _VERIFY_CACHE_SECRET, f"{hashed_password}|{plain_password}".encode(), hashlib.sha256
+        ).digest()
+        with self._verified_lock:
+            if self._verified_cache.get(key):
+                return True
+        if hashed_password.startswith("$argon2"):
+            verified: bool = self.argon2_context.verify(plain_password, hashed_password)
+        else:
+            verified = bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+        if verified:
+            with self._verified_lock:
+                self._verified_cache.set(key, True)
+        return verified
 
     def get_password_hash(self, password: str) -> str:
-        return self.pwd_context.hash(password)
+        if self.password_hash_scheme == "argon2":
+            return self.argon2_context.hash(password)
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=self.bcrypt_rounds)).decode()
+
+    def password_needs_rehash(self, hashed_password: str) -> bool:
+        """Whether a hash uses another scheme or bcrypt cost than new hashes would"""
+        if self.password_hash_scheme == "argon2":
+            return not hashed_password.startswith("$argon2") or self.argon2_context.needs_update(hashed_password)
+        # bcrypt hashes look like $2b$<rounds>$<salt+digest>
+        return not hashed_password.startswith("$2b$") or hashed_password[4:6] != f"{self.bcrypt_rounds:02d}"
+
+    def calibrate_password_hashing(self, target_ms: int, min_rounds: int = 10, max_rounds: int = 15) -> int:
+        """
+        Pick the bcrypt rounds so one hash takes about target_ms on this machine
+
+        Each extra round doubles the cost, so a single timed hash is enough to
+        estimate the right value. Existing hashes keep verifying because the
+        rounds are stored inside each hash.
+        """
+        rounds: int = self.bcrypt_rounds
+        started: float = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", bcrypt.gensalt(rounds=rounds))
+        elapsed_ms: float = max((time.perf_counter() - started) * 1000, 0.001)
+
+        rounds += round(math.log2(target_ms / elapsed_ms))
+        rounds = max(min_rounds, min(max_rounds, rounds))
+        self.bcrypt_rounds = rounds
+        return rounds
 
     def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         to_encode: Dict[str, Any] = data.copy()
@@ -143,8 +246,8 @@ class AuthService:
            await self.record_login_attempt(username, ip_address, False, "Email not verified")
            raise UserException("Please verify your email address before logging in", status_code=401)
            
-       # Verify password
-       password_verified: bool = self.verify_password(password, user["password"])
+       # Verify password (bcrypt is CPU-bound, keep it off the event loop)
+       password_verified: bool = await run_password_hash(self.verify_password, password, user["password"])
        
        if not password_verified:
            # Record failed attempt and increment failed login attempts
@@ -152,6 +255,13 @@ class AuthService:
            await self.increment_failed_attempts(str(user["_id"]))
            return None
            
+       # Replace hashes made with an old scheme or cost while we have the password;
+       # this is best-effort and must not fail a login that already verified
+       try:
+           await self.upgrade_password_hash(str(user["_id"]), password, user["password"])
+       except Exception:
+           logger.warning(f"Failed to upgrade password hash for user {user['_id']}", exc_info=True)
+       
        # Record successful login
        await self.record_login_attempt(username, ip_address, True)
        
@@ -163,24 +273,34 @@ class AuthService:
        
        return user
 
+    async def upgrade_password_hash(self, user_id: str, password: str, current_hash: str) -> bool:
+        """
+        Rehash a verified password if its hash uses a deprecated scheme or cost
+
+        Returns:
+            bool: True if a new hash was stored
+        """
+        if not self.password_needs_rehash(current_hash):
+            return False
+        new_hash: str = await run_password_hash(self.get_password_hash, password)
+        await self.user_repository.update_user(user_id, {"$set": {"password": new_hash}}, user_id)
+        return True
+
     async def increment_failed_attempts(self, user_id: str) -> None:
         """
         Increment failed login attempts and lock user if threshold reached
         """
-        user = await self.user_repository.find_by_id(user_id)
+        # $inc counts concurrent failures correctly and returns the new count
+        # without reading the user first
+        user = await self.user_repository.find_one_and_update(
+            user_id, {"$inc": {"failed_login_attempts": 1}}, user_id
+        )
         if not user:
             return
-            
-        current_attempts = user.get("failed_login_attempts", 0) + 1
-        
-        # Update failed attempts count
-        update_data = {"failed_login_attempts": current_attempts}
         
         # Lock user if they reach 5 failed attempts
-        if current_attempts >= 5:
-            update_data["is_locked"] = True
-            
-        await self.user_repository.update_user(user_id, {"$set": update_data}, user_id)
+        if user["failed_login_attempts"] >= 5 and not user.get("is_locked", False):
+            await self.user_repository.update_user(user_id, {"$set": {"is_locked": True}}, user_id)
         
     async def reset_failed_attempts(self, user_id: str) -> None:
         """
@@ -197,7 +317,7 @@ class AuthService:
         """
         Record a login attempt in both login history and user's login history
         """
-        user = await self.user_repository.find_by_username(username, include_password=True) if username else None
+        user = await self.user_repository.find_by_username(username, fields=()) if username else None
         
         # Prepare login history entry
         history = LoginHistory(
@@ -223,16 +343,12 @@ class AuthService:
             "status": "success"
         }
         
-        # First update the last login fields
+        # Update the last login fields and the login history array in one write
         await self.user_repository.update_user(user_id, {
             "$set": {
                 "last_login": login_time,
                 "last_login_ip": ip_address
-            }
-        }, user_id)
-        
-        # Then update the login history array
-        await self.user_repository.update_user(user_id, {
+            },
             "$push": {
                 "login_history": {
                     "$each": [login_entry],
@@ -279,17 +395,17 @@ class AuthService:
             refresh_expires_in=self.REFRESH_TOKEN_EXPIRE_MINUTES * 60
         )
 
-    async def register(self, user: UserCreate) -> Dict[str, Any]:
+    async def register(self, user: UserCreate, background_tasks: Optional[BackgroundTasks] = None) -> Dict[str, Any]:
         """
         Register a new user
         """
         # Hash password
-        user.password = self.get_password_hash(user.password)
+        user.password = await run_password_hash(self.get_password_hash, user.password)
         
         # Create user
-        from app.routers.user.user_service import UserService
-        user_service = UserService()
-        return await user_service.create_user(user, "")
+        # Imported here to avoid a circular import with user_service
+        from app.routers.user.user_service import get_user_service
+        return await get_user_service().create_user(user, "", background_tasks)
 
     async def get_login_history(self, user_id: str) -> Optional[LoginAttempt]:
         """
@@ -298,6 +414,13 @@ class AuthService:
         return await self.auth_repository.get_latest_attempts(user_id)
 
     async def verify_token(self, token: str) -> Optional[TokenData]:
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            expires_at, token_data = cached
+            if expires_at > time.time():
+                return token_data
+            self._token_cache.pop(token)
+
         try:
             payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
             username = payload.get("sub")
@@ -307,7 +430,7 @@ class AuthService:
             if username is None or user_id is None:
                 return None
                 
-            return TokenData(
+            token_data = TokenData(
                 username=username,
                 user_id=user_id,
                 roles=roles
@@ -315,6 +438,11 @@ class AuthService:
         except JWTError:
             return None
 
+        # jwt.decode has already rejected expired tokens; exp is a Unix timestamp
+        if "exp" in payload:
+            self._token_cache.set(token, (float(payload["exp"]), token_data))
+        return token_data
+
     async def unlock_user(self, user_id: str) -> bool:
         """
         Unlock a user by resetting their failed attempts and is_locked flag
@@ -331,6 +459,11 @@ class AuthService:
             # Also reset legacy login attempts for backward compatibility
             await self.auth_repository.delete_attempts(user_id)
             return True
-        except Exception as e:
-            print(f"Error unlocking user {user_id}: {str(e)}")
+        except Exception:
+            logger.exception(f"Error unlocking user {user_id}")
             return False
+
+@lru_cache()
+def get_auth_service() -> AuthService:
+    """Process-wide AuthService (shares refresh tokens and the password hasher)"""
+    return AuthService()
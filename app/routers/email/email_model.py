@@ -82,9 +82,6 @@ class EmailTask(BaseModel):
 
     class Config:
         populate_by_name = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 class EmailStats(BaseModel):
     total_emails: int
@@ -1,7 +1,7 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from bson import ObjectId
-from app.database import get_collection
+from app.database import get_collection, query_slot
 from app.routers.email.email_model import EmailTask, EmailTaskCreate, EmailStatus, EmailPriority, EmailStats
 import logging
 
@@ -9,33 +9,36 @@ logger = logging.getLogger(__name__)
 
 class EmailRepository:
     
+    def _build_task_document(self, email_data: EmailTaskCreate, now: datetime) -> Dict[str, Any]:
+        """Build the stored document for a new email task"""
+        return {
+            "to_emails": email_data.to_emails,
+            "subject": email_data.subject,
+            "body": email_data.body,
+            "html_body": email_data.html_body,
+            "priority": email_data.priority.value,
+            "status": EmailStatus.PENDING.value,
+            "reply_to": email_data.reply_to,
+            "cc_emails": email_data.cc_emails or [],
+            "bcc_emails": email_data.bcc_emails or [],
+            "attachments": email_data.attachments or [],
+            "template_data": email_data.template_data or {},
+            "created_by": email_data.created_by,
+            "created_at": now,
+            "updated_at": now,
+            "scheduled_at": email_data.scheduled_at,
+            "sent_at": None,
+            "error_message": None,
+            "retry_count": 0,
+            "max_retries": 3
+        }
+
     async def create_email_task(self, email_data: EmailTaskCreate) -> str:
         """Create a new email task"""
         try:
             collection = await get_collection("email_tasks")
             
-            now = datetime.now()
-            task_data = {
-                "to_emails": email_data.to_emails,
-                "subject": email_data.subject,
-                "body": email_data.body,
-                "html_body": email_data.html_body,
-                "priority": email_data.priority.value,
-                "status": EmailStatus.PENDING.value,
-                "reply_to": email_data.reply_to,
-                "cc_emails": email_data.cc_emails or [],
-                "bcc_emails": email_data.bcc_emails or [],
-                "attachments": email_data.attachments or [],
-                "template_data": email_data.template_data or {},
-                "created_by": email_data.created_by,
-                "created_at": now,
-                "updated_at": now,
-                "scheduled_at": email_data.scheduled_at,
-                "sent_at": None,
-                "error_message": None,
-                "retry_count": 0,
-                "max_retries": 3
-            }
+            task_data = self._build_task_document(email_data, datetime.now())
             
             result = await collection.insert_one(task_data)
             logger.info(f"Created email task with ID: {result.inserted_id}")
@@ -45,6 +48,29 @@ class EmailRepository:
             logger.error(f"Error creating email task: {str(e)}")
             raise
 
+    async def create_email_tasks_bulk(self, email_data_list: List[EmailTaskCreate]) -> List[str]:
+        """Create many email tasks with a single insert_many"""
+        if not email_data_list:
+            return []
+        try:
+            collection = await get_collection("email_tasks")
+            
+            now = datetime.now()
+            documents = [self._build_task_document(email_data, now) for email_data in email_data_list]
+            
+            result = await collection.insert_many(documents, ordered=False)
+            logger.info(f"Created {len(result.inserted_ids)} email tasks")
+            return [str(inserted_id) for inserted_id in result.inserted_ids]
+            
+        except Exception as e:
+            logger.error(f"Error creating email tasks: {str(e)}")
+            raise
+
+    async def email_task_exists(self, task_id: str) -> bool:
+        """Check whether an email task exists without fetching it"""
+        collection = await get_collection("email_tasks")
+        return await collection.find_one({"_id": ObjectId(task_id)}, {"_id": 1}) is not None
+
     async def get_email_task_by_id(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get email task by ID"""
         try:
@@ -206,8 +232,9 @@ class EmailRepository:
             cursor = collection.aggregate(pipeline)
             status_counts = {}
             
-            async for result in cursor:
-                status_counts[result["_id"]] = result["count"]
+            async with query_slot():
+                async for result in cursor:
+                    status_counts[result["_id"]] = result["count"]
             
             return EmailStats(
                 total_emails=sum(status_counts.values()),
@@ -221,12 +248,15 @@ class EmailRepository:
             logger.error(f"Error getting email stats: {str(e)}")
             raise
 
-    async def delete_email_task(self, task_id: str) -> bool:
-        """Delete email task"""
+    async def delete_email_task(self, task_id: str, created_by: Optional[str] = None) -> bool:
+        """Delete email task, only if it was created by created_by when given"""
         try:
             collection = await get_collection("email_tasks")
             
-            result = await collection.delete_one({"_id": ObjectId(task_id)})
+            query: Dict[str, Any] = {"_id": ObjectId(task_id)}
+            if created_by is not None:
+                query["created_by"] = created_by
+            result = await collection.delete_one(query)
             return result.deleted_count > 0
             
         except Exception as e:
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
 from typing import List, Optional
 from datetime import datetime
 
@@ -6,9 +6,11 @@ from app.dependencies.auth import get_current_user, require_roles
 from app.routers.email.email_model import (
     EmailRequest, EmailResponse, EmailStatus, EmailStats, EmailTaskCreate
 )
-from app.routers.email.email_service import EmailService
+from app.routers.email.email_service import get_email_service
 from app.routers.user.user_model import User
 from app.routers.auth.auth_model import UserRole
+from app.utils.object_id import OBJECT_ID_REGEX
+from app.workers.background_worker import add_email_to_queue
 
 router = APIRouter(prefix="/email", tags=["email"])
 
@@ -19,7 +21,7 @@ async def send_email(
 ):
     """Send email (queued for background processing)"""
     try:
-        email_service = EmailService()
+        email_service = get_email_service()
         
         # Create email task
         task_data = EmailTaskCreate(
@@ -41,7 +43,6 @@ async def send_email(
         
         # If send_immediately is True, process immediately
         if email_request.send_immediately:
-            from app.workers.background_worker import add_email_to_queue
             await add_email_to_queue(task_id)
         
         return EmailResponse(
@@ -65,7 +66,7 @@ async def send_email_immediately(
 ):
     """Send email immediately (bypass queue)"""
     try:
-        email_service = EmailService()
+        email_service = get_email_service()
         
         success = await email_service.send_immediate_email(
             to_emails=[str(email) for email in email_request.to_emails],
@@ -103,7 +104,7 @@ async def get_user_email_tasks(
 ):
     """Get email tasks for current user"""
     try:
-        email_service = EmailService()
+        email_service = get_email_service()
         
         tasks = await email_service.get_user_email_tasks(
             user_id=current_user.username,
@@ -122,12 +123,12 @@ async def get_user_email_tasks(
 
 @router.get("/tasks/{task_id}", response_model=dict)
 async def get_email_task(
-    task_id: str,
+    task_id: str = Path(..., regex=OBJECT_ID_REGEX),
     current_user: User = Depends(get_current_user)
 ):
     """Get specific email task"""
     try:
-        email_service = EmailService()
+        email_service = get_email_service()
         
         task = await email_service.get_email_task(task_id)
         if not task:
@@ -155,36 +156,29 @@ async def get_email_task(
 
 @router.delete("/tasks/{task_id}")
 async def delete_email_task(
-    task_id: str,
+    task_id: str = Path(..., regex=OBJECT_ID_REGEX),
     current_user: User = Depends(get_current_user)
 ):
     """Delete email task"""
     try:
-        email_service = EmailService()
+        email_service = get_email_service()
         
-        # Get task to check ownership
-        task = await email_service.get_email_task(task_id)
-        if not task:
+        # Non-admins can only delete their own tasks; the ownership check is
+        # part of the delete itself
+        created_by = None if UserRole.ADMIN in current_user.roles else current_user.username
+        if await email_service.delete_email_task(task_id, created_by):
+            return {"message": "Email task deleted successfully"}
+        
+        # Nothing deleted: tell a missing task apart from someone else's
+        if not await email_service.email_task_exists(task_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Email task not found"
             )
-        
-        # Check if user owns this task or is admin
-        if task["created_by"] != current_user.username and UserRole.ADMIN not in current_user.roles:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied"
-            )
-        
-        success = await email_service.delete_email_task(task_id)
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to delete email task"
-            )
-        
-        return {"message": "Email task deleted successfully"}
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
         
     except HTTPException:
         raise
@@ -200,7 +194,7 @@ async def get_email_stats(
 ):
     """Get email statistics for current user"""
     try:
-        email_service = EmailService()
+        email_service = get_email_service()
         
         stats = await email_service.get_email_stats(current_user.username)
         return stats
@@ -217,7 +211,7 @@ async def get_admin_email_stats(
 ):
     """Get email statistics for all users (admin only)"""
     try:
-        email_service = EmailService()
+        email_service = get_email_service()
         
         stats = await email_service.get_email_stats()
         return stats
@@ -230,12 +224,12 @@ async def get_admin_email_stats(
 
 @router.post("/retry/{task_id}")
 async def retry_email_task(
-    task_id: str,
+    task_id: str = Path(..., regex=OBJECT_ID_REGEX),
     current_user: User = Depends(get_current_user)
 ):
     """Retry failed email task"""
     try:
-        email_service = EmailService()
+        email_service = get_email_service()
         
         # Get task to check ownership and status
         task = await email_service.get_email_task(task_id)
@@ -260,7 +254,6 @@ async def retry_email_task(
             )
         
         # Add to email queue for retry
-        from app.workers.background_worker import add_email_to_queue
         await add_email_to_queue(task_id)
         
         return {"message": "Email task queued for retry"}
@@ -357,7 +350,7 @@ async def test_send_email(
 ):
     """Send a test email immediately for debugging (Admin only)"""
     try:
-        email_service = EmailService()
+        email_service = get_email_service()
         
         # Send a simple test email
         success = await email_service.send_immediate_email(
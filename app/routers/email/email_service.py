@@ -1,4 +1,6 @@
 import smtplib
+import socket
+import threading
 import asyncio
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -6,6 +8,7 @@ from email.mime.base import MIMEBase
 from email import encoders
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from functools import lru_cache
 import os
 import logging
 from jinja2 import Template
@@ -22,6 +25,57 @@ class EmailService:
     def __init__(self):
         self.settings = get_settings()
         self.repository = EmailRepository()
+        # One SMTP connection is kept open and reused across sends
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_lock = threading.Lock()
+
+    def _connect_smtp(self) -> smtplib.SMTP:
+        """Open and authenticate a new SMTP connection"""
+        logger.info(f"📧 Creating SMTP connection to {self.settings.SMTP_HOST}:{self.settings.SMTP_PORT}")
+        server = smtplib.SMTP(self.settings.SMTP_HOST, self.settings.SMTP_PORT, timeout=30)
+        try:
+            if self.settings.SMTP_USE_TLS:
+                server.starttls()
+            server.login(self.settings.SMTP_USERNAME, self.settings.SMTP_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        logger.info(f"📧 SMTP connection ready")
+        return server
+
+    def _deliver(self, msg: MIMEMultipart, recipients: List[str]) -> Dict[str, Any]:
+        """Send a message on the shared SMTP connection (blocking, run in a thread)
+
+        A connection the server has dropped while idle is reopened once.
+        """
+        with self._smtp_lock:
+            try:
+                if self._smtp is not None:
+                    try:
+                        return self._smtp.send_message(msg, to_addrs=recipients)
+                    except smtplib.SMTPServerDisconnected:
+                        logger.info(f"📧 SMTP connection was closed by the server, reconnecting")
+                        self._smtp = None
+                self._smtp = self._connect_smtp()
+                return self._smtp.send_message(msg, to_addrs=recipients)
+            except Exception:
+                # Never reuse a connection left in an unknown state
+                self._close_smtp()
+                raise
+
+    def _close_smtp(self) -> None:
+        """Close the shared SMTP connection, if any"""
+        server, self._smtp = self._smtp, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+
+    def close(self) -> None:
+        """Release the SMTP connection (called on application shutdown)"""
+        with self._smtp_lock:
+            self._close_smtp()
 
     async def send_email_task(self, task_data: Dict[str, Any]) -> bool:
         """Send email from task data"""
@@ -83,13 +137,8 @@ class EmailService:
             return False
 
     async def _send_smtp_email(self, msg: MIMEMultipart, task_data: Dict[str, Any]) -> bool:
-        """Send email via SMTP with detailed debugging"""
-        server = None
+        """Send email via SMTP, reusing the service's connection"""
         try:
-            # Log SMTP configuration (without password)
-            logger.info(f"📧 SMTP Config - Host: {self.settings.SMTP_HOST}, Port: {self.settings.SMTP_PORT}, TLS: {self.settings.SMTP_USE_TLS}")
-            logger.info(f"📧 SMTP From: {self.settings.SMTP_FROM_EMAIL}, Username: {self.settings.SMTP_USERNAME}")
-            
             # Validate SMTP configuration
             if not all([
                 self.settings.SMTP_HOST,
@@ -99,32 +148,6 @@ class EmailService:
             ]):
                 raise Exception("SMTP configuration is incomplete")
             
-            # Test network connectivity first
-            import socket
-            logger.info(f"📧 Testing network connectivity to {self.settings.SMTP_HOST}:{self.settings.SMTP_PORT}")
-            try:
-                sock = socket.create_connection((self.settings.SMTP_HOST, self.settings.SMTP_PORT), timeout=10)
-                sock.close()
-                logger.info(f"📧 ✅ Network connectivity OK")
-            except Exception as conn_error:
-                raise Exception(f"Network connectivity failed: {str(conn_error)}")
-            
-            # Create SMTP connection with debugging
-            logger.info(f"📧 Creating SMTP connection to {self.settings.SMTP_HOST}:{self.settings.SMTP_PORT}")
-            server = smtplib.SMTP(self.settings.SMTP_HOST, self.settings.SMTP_PORT, timeout=30)
-            # server.set_debuglevel(1)  # Disable SMTP debugging for production
-            
-            logger.info(f"📧 SMTP connection established, server response: {server.noop()}")
-            
-            if self.settings.SMTP_USE_TLS:
-                logger.info(f"📧 Starting TLS...")
-                server.starttls()
-                logger.info(f"📧 TLS started successfully")
-            
-            logger.info(f"📧 Logging in with username: {self.settings.SMTP_USERNAME}")
-            server.login(self.settings.SMTP_USERNAME, self.settings.SMTP_PASSWORD)
-            logger.info(f"📧 Login successful")
-            
             # Prepare recipient list
             recipients = task_data["to_emails"][:]
             if task_data.get("cc_emails"):
@@ -135,11 +158,9 @@ class EmailService:
             logger.info(f"📧 Sending email to recipients: {recipients}")
             logger.info(f"📧 Email subject: {msg['Subject']}")
             
-            # Send email
-            result = server.send_message(msg, to_addrs=recipients)
+            # smtplib is blocking, keep it off the event loop
+            result = await asyncio.to_thread(self._deliver, msg, recipients)
             logger.info(f"📧 Send result: {result}")
-            
-            server.quit()
             logger.info(f"📧 ✅ Email sent successfully")
             
             return True
@@ -168,12 +189,6 @@ class EmailService:
             error_msg = f"Unexpected error: {str(e)}"
             logger.error(f"📧 ❌ {error_msg}")
             return False
-        finally:
-            if server:
-                try:
-                    server.quit()
-                except:
-                    pass
 
     async def _add_attachment(self, msg: MIMEMultipart, file_path: str):
         """Add attachment to email"""
@@ -246,6 +261,17 @@ class EmailService:
             logger.error(f"Error creating email task: {str(e)}")
             raise
 
+    async def create_email_tasks_bulk(self, email_data_list: List[EmailTaskCreate]) -> List[str]:
+        """Create many email tasks in one database round-trip"""
+        try:
+            task_ids = await self.repository.create_email_tasks_bulk(email_data_list)
+            logger.info(f"📧 Created {len(task_ids)} email tasks")
+            return task_ids
+            
+        except Exception as e:
+            logger.error(f"Error creating email tasks: {str(e)}")
+            raise
+
     async def get_email_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get email task by ID"""
         return await self.repository.get_email_task_by_id(task_id)
@@ -266,9 +292,13 @@ class EmailService:
         """Get email statistics"""
         return await self.repository.get_email_stats(user_id)
 
-    async def delete_email_task(self, task_id: str) -> bool:
-        """Delete email task"""
-        return await self.repository.delete_email_task(task_id)
+    async def delete_email_task(self, task_id: str, created_by: Optional[str] = None) -> bool:
+        """Delete email task (only the creator's, when created_by is given)"""
+        return await self.repository.delete_email_task(task_id, created_by)
+
+    async def email_task_exists(self, task_id: str) -> bool:
+        """Check whether an email task exists"""
+        return await self.repository.email_task_exists(task_id)
 
     def render_template(self, template: str, data: Dict[str, Any]) -> str:
         """Render email template with data"""
@@ -327,4 +357,9 @@ class EmailService:
 
     async def get_failed_tasks_for_retry(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get failed tasks that can be retried"""
-        return await self.repository.get_failed_email_tasks(limit)
\ No newline at end of file
+        return await self.repository.get_failed_email_tasks(limit)
+
+@lru_cache()
+def get_email_service() -> EmailService:
+    """Process-wide EmailService"""
+    return EmailService()
@@ -0,0 +1,116 @@
+from jinja2 import Template
+
+# Email templates are compiled once at import time and rendered per send.
+# HTML templates escape their values, since user names are user input.
+
+ACCOUNT_SETUP_SUBJECT = "Complete Your Account Setup"
+
+ACCOUNT_SETUP_TEXT = Template("""
+Hello {{ user_name }},
+
+Your account has been created! Please complete your account setup by creating a password and verifying your email address.
+
+Click the link below to set up your password:
+
+{{ verification_url }}
+
+This link will expire in 24 hours.
+
+If you did not expect this email, please ignore it.
+
+Best regards,
+CSV2JSON Team
+""".strip())
+
+ACCOUNT_SETUP_HTML = Template("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Account Setup</title>
+</head>
+<body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+    <h2 style="color: #333;">Welcome to CSV2JSON!</h2>
+    
+    <p>Hello {{ user_name }},</p>
+    
+    <p>Your account has been created! Please complete your account setup by creating a password and verifying your email address.</p>
+    
+    <div style="text-align: center; margin: 30px 0;">
+        <a href="{{ verification_url }}" 
+           style="background-color: #007bff; color: white; padding: 12px 25px; 
+                  text-decoration: none; border-radius: 5px; display: inline-block;">
+            Set Up Password
+        </a>
+    </div>
+    
+    <p>Or copy and paste this link into your browser:</p>
+    <p style="word-break: break-all; color: #666;">{{ verification_url }}</p>
+    
+    <p><strong>This link will expire in 24 hours.</strong></p>
+    
+    <p>If you did not expect this email, please ignore it.</p>
+    
+    <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
+    <p style="color: #888; font-size: 12px;">
+        Best regards,<br>
+        CSV2JSON Team
+    </p>
+</body>
+</html>
+""".strip(), autoescape=True)
+
+PASSWORD_RESET_SUBJECT = "Password Reset Request"
+
+PASSWORD_RESET_TEXT = Template("""
+Hello {{ user_name }},
+
+You have requested to reset your password. Click the link below to create a new password:
+
+{{ reset_url }}
+
+This link will expire in 1 hour.
+
+If you did not request this password reset, please ignore this email.
+
+Best regards,
+CSV2JSON Team
+""".strip())
+
+PASSWORD_RESET_HTML = Template("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Password Reset</title>
+</head>
+<body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+    <h2 style="color: #333;">Password Reset Request</h2>
+    
+    <p>Hello {{ user_name }},</p>
+    
+    <p>You have requested to reset your password. Click the button below to create a new password:</p>
+    
+    <div style="text-align: center; margin: 30px 0;">
+        <a href="{{ reset_url }}" 
+           style="background-color: #dc3545; color: white; padding: 12px 25px; 
+                  text-decoration: none; border-radius: 5px; display: inline-block;">
+            Reset Password
+        </a>
+    </div>
+    
+    <p>Or copy and paste this link into your browser:</p>
+    <p style="word-break: break-all; color: #666;">{{ reset_url }}</p>
+    
+    <p><strong>This link will expire in 1 hour.</strong></p>
+    
+    <p>If you did not request this password reset, please ignore this email.</p>
+    
+    <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
+    <p style="color: #888; font-size: 12px;">
+        Best regards,<br>
+        CSV2JSON Team
+    </p>
+</body>
+</html>
+""".strip(), autoescape=True)
@@ -1,8 +1,10 @@
 from typing import Optional, Dict, List, Any
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime
-from app.database import get_collection
+from app.database import get_collection, query_slot
 from app.utils.serializers import list_serial, individual_serial
+from app.utils.object_id import is_valid_object_id
 from app.routers.file.file_model import UploadStatus
 
 class FileRepository:
@@ -24,7 +26,7 @@ class FileRepository:
 
     async def get_file_by_id(self, file_id: str) -> Optional[Dict[str, Any]]:
         """Get file by ID"""
-        if not ObjectId.is_valid(file_id):
+        if not is_valid_object_id(file_id):
             return None
 
         files_collection = await get_collection("files")
@@ -38,10 +40,19 @@ class FileRepository:
         files_collection = await get_collection("files")
         
         skip = (page - 1) * limit
-        total = await files_collection.count_documents({})
         
-        cursor = files_collection.find().sort("upload_date", -1).skip(skip).limit(limit)
-        files = await cursor.to_list(length=limit)
+        # Count and fetch the page in one aggregation
+        cursor = files_collection.aggregate([
+            {"$sort": {"upload_date": -1}},
+            {"$facet": {
+                "data": [{"$skip": skip}, {"$limit": limit}],
+                "total": [{"$count": "count"}]
+            }}
+        ])
+        async with query_slot():
+            [result] = await cursor.to_list(length=1)
+        files = result["data"]
+        total = result["total"][0]["count"] if result["total"] else 0
         
         return {
             "list": list_serial(files),
@@ -52,7 +63,7 @@ class FileRepository:
 
     async def delete_file_by_id(self, file_id: str) -> None:
         """Delete file by ID from database"""
-        if not ObjectId.is_valid(file_id):
+        if not is_valid_object_id(file_id):
             raise ValueError("Invalid file_id format")
 
         files_collection = await get_collection("files")
@@ -71,20 +82,25 @@ class FileRepository:
         result = await uploads_collection.insert_one(upload_data)
         return str(result.inserted_id)
 
-    async def get_chunked_upload(self, upload_id: str) -> Optional[Dict[str, Any]]:
-        """Get chunked upload session by ID"""
-        if not ObjectId.is_valid(upload_id):
+    async def get_chunked_upload(self, upload_id: str, include_chunks: bool = True) -> Optional[Dict[str, Any]]:
+        """Get chunked upload session by ID
+
+        include_chunks=False leaves out the received_chunks array; the
+        received_count field still says how many chunks have arrived.
+        """
+        if not is_valid_object_id(upload_id):
             return None
 
         uploads_collection = await get_collection("chunked_uploads")
-        upload = await uploads_collection.find_one({"_id": ObjectId(upload_id)})
+        projection = None if include_chunks else {"received_chunks": 0}
+        upload = await uploads_collection.find_one({"_id": ObjectId(upload_id)}, projection)
         if upload:
             return individual_serial(upload)
         return None
 
     async def update_chunked_upload(self, upload_id: str, update_data: Dict[str, Any], updated_by: str = "worker") -> bool:
         """Update chunked upload session"""
-        if not ObjectId.is_valid(upload_id):
+        if not is_valid_object_id(upload_id):
             return False
 
         uploads_collection = await get_collection("chunked_uploads")
@@ -103,26 +119,39 @@ class FileRepository:
 
     async def delete_chunked_upload(self, upload_id: str) -> None:
         """Delete chunked upload session"""
-        if not ObjectId.is_valid(upload_id):
+        if not is_valid_object_id(upload_id):
             raise ValueError("Invalid upload_id format")
 
         uploads_collection = await get_collection("chunked_uploads")
         await uploads_collection.delete_one({"_id": ObjectId(upload_id)})
 
-    async def add_received_chunk(self, upload_id: str, chunk_number: int, updated_by: str = "worker") -> bool:
-        """Add chunk number to received chunks list"""
-        if not ObjectId.is_valid(upload_id):
-            return False
+    async def add_received_chunk(self, upload_id: str, chunk_number: int, updated_by: str = "worker") -> Optional[int]:
+        """Record a received chunk and mark the upload in progress, in one update
+
+        The filter only matches while chunk_number is not recorded yet, so the
+        array is scanned once and concurrent duplicates cannot both succeed.
+        Only the received_count counter is sent back, not the growing array.
+
+        Returns:
+            The number of chunks received so far, or None if the session does
+            not exist or already had this chunk
+        """
+        if not is_valid_object_id(upload_id):
+            return None
 
         uploads_collection = await get_collection("chunked_uploads")
-        result = await uploads_collection.update_one(
-            {"_id": ObjectId(upload_id)},
+        upload = await uploads_collection.find_one_and_update(
+            {"_id": ObjectId(upload_id), "received_chunks": {"$ne": chunk_number}},
             {
-                "$addToSet": {"received_chunks": chunk_number},
+                "$push": {"received_chunks": chunk_number},
+                "$inc": {"received_count": 1},
                 "$set": {
+                    "status": UploadStatus.IN_PROGRESS,
                     "updated_at": datetime.now(),
                     "updated_by": updated_by
                 }
-            }
+            },
+            projection={"received_count": 1},
+            return_document=ReturnDocument.AFTER
         )
-        return result.modified_count > 0
+        return upload["received_count"] if upload else None
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, UploadFile, File, Query, Depends, Form
+from fastapi import APIRouter, UploadFile, File, Query, Depends, Form, Path
 from fastapi.responses import FileResponse
 from app.routers.file.file_service import FileService
 from app.routers.file.file_model import InitiateUploadRequest
 from app.utils.advanced_performance import tracker
 from app.dependencies.auth import require_user
-from app.api.schemas import PaginationResponse
+from app.api.schemas import PaginationResponse, PaginatedJSONResponse
+from app.utils.object_id import OBJECT_ID_REGEX
 from typing import Dict, Any
 
 router = APIRouter(
@@ -26,15 +27,15 @@ async def upload_file(file: UploadFile = File(...), current_user: Any = Depends(
 
 @router.get("/", response_model=PaginationResponse[Dict[str, Any]])
 @tracker.measure_async_time
-async def get_all_files(page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=100), current_user: Any = Depends(require_user)) -> Dict[str, Any]:
+async def get_all_files(page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=100), current_user: Any = Depends(require_user)) -> PaginatedJSONResponse:
     """
     📋 ดึงรายการไฟล์ทั้งหมด
     """
-    return await file_service.get_all_files(page, limit)
+    return PaginatedJSONResponse(await file_service.get_all_files(page, limit))
 
 @router.get("/{file_id}")
 @tracker.measure_async_time
-async def get_file(file_id: str, current_user: Any = Depends(require_user)) -> Dict[str, Any]:
+async def get_file(file_id: str = Path(..., regex=OBJECT_ID_REGEX), current_user: Any = Depends(require_user)) -> Dict[str, Any]:
     """
     📝 ดึงข้อมูลไฟล์ตาม ID
     """
@@ -42,7 +43,7 @@ async def get_file(file_id: str, current_user: Any = Depends(require_user)) -> D
 
 @router.delete("/{file_id}")
 @tracker.measure_async_time
-async def delete_file(file_id: str, current_user: Any = Depends(require_user)) -> bool:
+async def delete_file(file_id: str = Path(..., regex=OBJECT_ID_REGEX), current_user: Any = Depends(require_user)) -> bool:
     """
     🗑️ ลบไฟล์ตาม ID
     """
@@ -50,7 +51,7 @@ async def delete_file(file_id: str, current_user: Any = Depends(require_user)) -
 
 @router.get("/download/{file_id}")
 @tracker.measure_async_time
-async def download_file(file_id: str, current_user = Depends(require_user)) -> FileResponse:
+async def download_file(file_id: str = Path(..., regex=OBJECT_ID_REGEX), current_user = Depends(require_user)) -> FileResponse:
     """
     ⬇️ ดาวน์โหลดไฟล์ตาม ID
     """
@@ -67,7 +68,7 @@ async def initiate_chunked_upload(request: InitiateUploadRequest, current_user:
 @router.post("/chunked/{upload_id}/chunk")
 @tracker.measure_async_time
 async def upload_chunk(
-    upload_id: str,
+    upload_id: str = Path(..., regex=OBJECT_ID_REGEX),
     chunk_number: int = Form(...),
     chunk: UploadFile = File(...),
     current_user: Any = Depends(require_user)
@@ -79,7 +80,7 @@ async def upload_chunk(
 
 @router.get("/chunked/{upload_id}/status")
 @tracker.measure_async_time
-async def get_chunked_upload_status(upload_id: str, current_user: Any = Depends(require_user)) -> Dict[str, Any]:
+async def get_chunked_upload_status(upload_id: str = Path(..., regex=OBJECT_ID_REGEX), current_user: Any = Depends(require_user)) -> Dict[str, Any]:
     """
     📊 ตรวจสอบสถานะการอัปโหลดแบบ chunked
     """
@@ -87,7 +88,7 @@ async def get_chunked_upload_status(upload_id: str, current_user: Any = Depends(
 
 @router.delete("/chunked/{upload_id}")
 @tracker.measure_async_time
-async def cancel_chunked_upload(upload_id: str, current_user: Any = Depends(require_user)) -> bool:
+async def cancel_chunked_upload(upload_id: str = Path(..., regex=OBJECT_ID_REGEX), current_user: Any = Depends(require_user)) -> bool:
     """
     ❌ ยกเลิกการอัปโหลดแบบ chunked
     """
@@ -182,6 +182,7 @@ class FileService:
         try:
             total_chunks = (request.total_size + request.chunk_size - 1) // request.chunk_size
             
+            now = datetime.now()
             upload_data = {
                 "original_filename": request.filename,
                 "total_chunks": total_chunks,
@@ -190,8 +191,9 @@ class FileService:
                 "mime_type": request.mime_type,
                 "status": UploadStatus.PENDING,
                 "received_chunks": [],
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
+                "received_count": 0,
+                "created_at": now,
+                "updated_at": now
             }
             
             upload_id = await self.file_repository.create_chunked_upload(upload_data, user_id)
@@ -223,8 +225,8 @@ class FileService:
             Upload progress information
         """
         try:
-            # Get upload session
-            upload_session = await self.file_repository.get_chunked_upload(upload_id)
+            # Get upload session (without the received_chunks array)
+            upload_session = await self.file_repository.get_chunked_upload(upload_id, include_chunks=False)
             if not upload_session:
                 raise FileException("Upload session not found", status_code=404)
             
@@ -235,32 +237,25 @@ class FileService:
             if chunk_number >= upload_session["total_chunks"] or chunk_number < 0:
                 raise FileException("Invalid chunk number", status_code=400)
             
-            # Check if chunk already received
-            if chunk_number in upload_session["received_chunks"]:
-                raise FileException("Chunk already received", status_code=400)
-            
-            # Save chunk to temporary file
+            # Save chunk to its own temporary file; it only replaces chunk_N once
+            # the chunk is recorded, so a rejected duplicate cannot overwrite it
             chunks_dir = os.path.join("temp", "chunks", upload_id)
             chunk_path = os.path.join(chunks_dir, f"chunk_{chunk_number}")
-            
-            with open(chunk_path, "wb") as buffer:
-                shutil.copyfileobj(chunk_data.file, buffer)
-            
-            # Update upload session
-            await self.file_repository.add_received_chunk(upload_id, chunk_number)
-            
-            # Update status to in_progress if first chunk
-            if upload_session["status"] == UploadStatus.PENDING:
-                await self.file_repository.update_chunked_upload(
-                    upload_id,
-                    {"status": UploadStatus.IN_PROGRESS}
-                )
-            
-            # Get updated session
-            updated_session = await self.file_repository.get_chunked_upload(upload_id)
-            if not updated_session:
-                raise FileException("Upload session not found after update", status_code=404)
-            received_count = len(updated_session["received_chunks"])
+            part_path = f"{chunk_path}.{uuid.uuid4().hex}.part"
+            
+            try:
+                with open(part_path, "wb") as buffer:
+                    shutil.copyfileobj(chunk_data.file, buffer)
+                
+                # Record the chunk and mark the session in progress in one update;
+                # its filter skips chunks that were already received
+                received_count = await self.file_repository.add_received_chunk(upload_id, chunk_number)
+                if received_count is None:
+                    raise FileException("Chunk already received", status_code=400)
+                os.replace(part_path, chunk_path)
+            finally:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
             
             # Check if all chunks received
             if received_count == upload_session["total_chunks"]:
@@ -365,11 +360,11 @@ class FileService:
             Upload status information
         """
         try:
-            upload_session = await self.file_repository.get_chunked_upload(upload_id)
+            upload_session = await self.file_repository.get_chunked_upload(upload_id, include_chunks=False)
             if not upload_session:
                 raise FileException("Upload session not found", status_code=404)
             
-            received_count = len(upload_session["received_chunks"])
+            received_count = upload_session["received_count"]
             progress = (received_count / upload_session["total_chunks"]) * 100 if upload_session["total_chunks"] > 0 else 0
             
             return {
@@ -396,7 +391,7 @@ class FileService:
             True if cancellation was successful
         """
         try:
-            upload_session = await self.file_repository.get_chunked_upload(upload_id)
+            upload_session = await self.file_repository.get_chunked_upload(upload_id, include_chunks=False)
             if not upload_session:
                 raise FileException("Upload session not found", status_code=404)
             
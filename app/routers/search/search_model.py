@@ -111,3 +111,6 @@ class AdvancedSearchQueryResult(BaseModel):
     query_no: int = Field(description="Query number from input")
     query_name: str = Field(description="Combined name from all columns")
     column_results: Dict[str, ColumnResult] = Field(description="Results for each column")
+
+class DeleteSearchesRequest(BaseModel):
+    search_ids: List[str] = Field(min_items=1, max_items=100, description="Search IDs to delete")
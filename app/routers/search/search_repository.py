@@ -1,8 +1,9 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from datetime import datetime
 from bson import ObjectId # type: ignore
-from app.database import get_collection
+from app.database import get_collection, query_slot
 from app.utils.serializers import list_serial, individual_serial
+from app.utils.object_id import is_valid_object_id
 from app.routers.task.task_repository import TaskRepository
 
 class SearchRepository:
@@ -24,7 +25,8 @@ class SearchRepository:
         else:
             cursor = collection.find(query)
         
-        records = await cursor.to_list(length=None)
+        async with query_slot():
+            records = await cursor.to_list(length=None)
         return list_serial(records)
 
     async def get_available_columns(self, task_id: str) -> Dict[str, Any]:
@@ -94,7 +96,8 @@ class SearchRepository:
         else:
             cursor = collection.find(query, projection)
         
-        records = await cursor.to_list(length=None)
+        async with query_slot():
+            records = await cursor.to_list(length=None)
         return list_serial(records)
 
     async def save_search_history(self, search_data: Dict[str, Any], created_by: str) -> str:
@@ -229,32 +232,45 @@ class SearchRepository:
         
         return result.modified_count > 0
 
-    async def get_pending_searches(self) -> List[Dict[str, Any]]:
-        """Get all pending search tasks"""
+    async def iter_pending_searches(self) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every pending search with just the fields needed to run it"""
         collection = await get_collection(self.search_history_collection_name)
         
-        cursor = collection.find({"status": "pending"})
-        searches = await cursor.to_list(length=None)
-        
-        return list_serial(searches)
+        cursor = collection.find({"status": "pending"}, {
+            "task_id": 1,
+            "created_by": 1,
+            "column_names": 1,
+            "column_options": 1,
+            "query_list": 1
+        })
+        async for search in cursor:
+            yield individual_serial(search)
 
     async def delete_search_history(self, search_id: str, user_id: str) -> bool:
         """Delete search history by search_id for a specific user"""
+        if not is_valid_object_id(search_id):
+            return False
+        
         collection = await get_collection(self.search_history_collection_name)
         
-        # Check if the search exists and belongs to the user
-        search_doc = await collection.find_one({
+        # Only matches when the search belongs to the user
+        result = await collection.delete_one({
             "_id": ObjectId(search_id),
             "created_by": user_id
         })
         
-        if not search_doc:
-            return False
+        return result.deleted_count > 0
+
+    async def delete_search_histories(self, search_ids: List[str], user_id: str) -> int:
+        """Delete the user's search histories among search_ids in one call, returning how many were deleted"""
+        object_ids = [ObjectId(search_id) for search_id in search_ids if is_valid_object_id(search_id)]
+        if not object_ids:
+            return 0
         
-        # Delete the search history
-        result = await collection.delete_one({
-            "_id": ObjectId(search_id),
+        collection = await get_collection(self.search_history_collection_name)
+        result = await collection.delete_many({
+            "_id": {"$in": object_ids},
             "created_by": user_id
         })
         
-        return result.deleted_count > 0
\ No newline at end of file
+        return result.deleted_count
\ No newline at end of file
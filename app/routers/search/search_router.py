@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
 from typing import Dict, Any
-from app.api.schemas.pagination import PaginationResponse
+from app.api.schemas.pagination import PaginationResponse, PaginatedJSONResponse
 from app.routers.search.search_service import SearchService
-from app.routers.search.search_model import AdvancedSearchRequest
+from app.routers.search.search_model import AdvancedSearchRequest, DeleteSearchesRequest
 from app.dependencies.auth import require_user
 from app.utils.advanced_performance import tracker
 from app.exceptions import TaskException
+from app.utils.object_id import OBJECT_ID_REGEX
 
 router = APIRouter(
     prefix="/search",
@@ -82,7 +83,7 @@ async def get_search_history(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(10, ge=1, le=100, description="Items per page"),
     current_user: Any = Depends(require_user)
-) -> Dict[str, Any]:
+) -> PaginatedJSONResponse:
     """
     📜 Get search history for the current user
     
@@ -92,14 +93,14 @@ async def get_search_history(
         history_data = await search_service.get_search_history(
             current_user.user_id, page, limit
         )
-        return history_data
+        return PaginatedJSONResponse(history_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/result/{search_id}")
 @tracker.measure_async_time
 async def get_search_result(
-    search_id: str = Path(..., description="Search ID to get search result for"),
+    search_id: str = Path(..., regex=OBJECT_ID_REGEX, description="Search ID to get search result for"),
     current_user: Any = Depends(require_user)
 ) -> Dict[str, Any]:
     """
@@ -118,7 +119,7 @@ async def get_search_result(
 @router.delete("/{search_id}")
 @tracker.measure_async_time
 async def delete_search(
-    search_id: str = Path(..., description="Search ID to delete"),
+    search_id: str = Path(..., regex=OBJECT_ID_REGEX, description="Search ID to delete"),
     current_user: Any = Depends(require_user)
 ) -> Dict[str, str]:
     """
@@ -133,6 +134,24 @@ async def delete_search(
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/delete-batch")
+@tracker.measure_async_time
+async def delete_searches(
+    request: DeleteSearchesRequest,
+    current_user: Any = Depends(require_user)
+) -> Dict[str, int]:
+    """
+    🗑️ Delete several search history records
+    
+    Deletes the given search records in one request. IDs that do not exist or
+    belong to another user are skipped; the response says how many were deleted.
+    """
+    try:
+        deleted = await search_service.delete_searches(request.search_ids, current_user.user_id)
+        return {"deleted": deleted}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
     
 @router.get("/health")
 @tracker.measure_async_time
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 import re
 from app.routers.search.search_repository import SearchRepository
 from app.routers.search.search_model import (AdvancedSearchRequest,ColumnOptions)
@@ -137,3 +137,7 @@ class SearchService:
         if not success:
             raise TaskException(f"Search with ID {search_id} not found or you don't have permission to delete it")
         return success
+
+    async def delete_searches(self, search_ids: List[str], user_id: str) -> int:
+        """Delete several of a user's search histories, returning how many were deleted"""
+        return await self.repository.delete_search_histories(search_ids, user_id)
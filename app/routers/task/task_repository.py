@@ -1,8 +1,110 @@
-from typing import Optional, List, Tuple, Dict, Any
+from typing import Optional, List, Tuple, Dict, Any, AsyncIterator
 from datetime import datetime
+import asyncio
+import time
 from bson import ObjectId # type: ignore
-from app.database import get_collection
-from app.utils.serializers import list_serial
+from app.database import get_collection, query_slot
+from app.config import get_settings
+from app.utils.cache import TTLCache
+from app.utils.batch import BatchLoader
+from app.utils.serializers import individual_serial
+from app.utils.object_id import is_valid_object_id
+
+settings = get_settings()
+
+# Shared by every TaskRepository instance; invalidated on update/delete.
+# Concurrent misses for the same task share the load in _task_loads
+_task_cache = TTLCache(maxsize=settings.TASK_CACHE_MAX_SIZE, ttl=settings.TASK_CACHE_TTL_SECONDS)
+_task_loads: "Dict[str, asyncio.Task[Optional[Dict[str, Any]]]]" = {}
+
+# List pages keyed by (page, limit, after), stored with the time they go stale.
+# Each page has at most one query in flight, tracked in _task_list_refreshing.
+# A load only stores its result if it is still the registered one, so a load
+# that started before a task write cannot cache pre-write data
+_task_list_cache = TTLCache(maxsize=256, ttl=settings.TASK_LIST_CACHE_TTL_SECONDS)
+_task_list_refreshing: "Dict[Tuple[int, int, Optional[str]], asyncio.Task[Any]]" = {}
+
+def _invalidate_task_lists() -> None:
+    _task_list_cache.clear()
+    _task_list_refreshing.clear()
+
+def format_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a task document (with an optional joined file_info) for the API"""
+    task["_id"] = str(task["_id"])
+    # Handle both string and datetime dates
+    if isinstance(task["created_file_date"], datetime):
+        task["created_file_date"] = task["created_file_date"].strftime("%Y-%m-%d")
+    if isinstance(task["updated_file_date"], datetime):
+        task["updated_file_date"] = task["updated_file_date"].strftime("%Y-%m-%d")
+    task["created_at"] = task["created_at"].isoformat()
+    task["updated_at"] = task["updated_at"].isoformat()
+    
+    # Add original_filename from joined file_info
+    if "file_info" in task and task["file_info"]:
+        task["original_filename"] = task["file_info"].get("original_filename", "")
+    else:
+        task["original_filename"] = ""
+    
+    # Remove file_info and temporary field from response
+    task.pop("file_info", None)
+    task.pop("file_id_obj", None)
+    
+    return task
+
+def _encode_task_cursor(task: Dict[str, Any]) -> str:
+    """Cursor for the page after task: its created_at and _id"""
+    return f"{task['created_at'].isoformat()}_{task['_id']}"
+
+def _decode_task_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, ObjectId]]:
+    """Parse a cursor from _encode_task_cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    created_at, _, task_id = cursor.rpartition("_")
+    if not is_valid_object_id(task_id):
+        return None
+    try:
+        return datetime.fromisoformat(created_at), ObjectId(task_id)
+    except ValueError:
+        return None
+
+async def _fetch_tasks(task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Read tasks with their files from the database, keyed by task id"""
+    tasks_collection = await get_collection("tasks")
+    
+    # Use aggregation to join with files collection
+    pipeline = [
+        {
+            "$match": {"_id": {"$in": [ObjectId(task_id) for task_id in task_ids]}}
+        },
+        {
+            "$addFields": {
+                "file_id_obj": {"$toObjectId": "$file_id"}
+            }
+        },
+        {
+            "$lookup": {
+                "from": "files",
+                "localField": "file_id_obj",
+                "foreignField": "_id",
+                "as": "file_info"
+            }
+        },
+        {
+            "$unwind": {
+                "path": "$file_info",
+                "preserveNullAndEmptyArrays": True
+            }
+        }
+    ]
+    
+    async with query_slot():
+        results = await tasks_collection.aggregate(pipeline).to_list(length=len(task_ids))
+    
+    tasks = (format_task(result) for result in results)
+    return {task["_id"]: task for task in tasks}
+
+# Task reads that miss the cache in the same event-loop iteration share one query
+_task_batch: BatchLoader[str, Dict[str, Any]] = BatchLoader(lambda task_ids: _fetch_tasks(task_ids))
 
 class TaskRepository:
     async def create_task(self, task_data: Dict[str, Any], user_id: str) -> str:
@@ -10,28 +112,88 @@ class TaskRepository:
         tasks_collection = await get_collection("tasks")
         
         # Add audit fields
+        now = datetime.now()
         task_data.update({
             "created_by": user_id,
-            "created_at": datetime.now(),
+            "created_at": now,
             "updated_by": user_id,
-            "updated_at": datetime.now()
+            "updated_at": now
         })
         
         result = await tasks_collection.insert_one(task_data)
+        _invalidate_task_lists()
         return str(result.inserted_id)
 
-    async def get_all_tasks(self, page: int = 1, limit: int = 10) -> Tuple[List[Dict[str, Any]], int]:
-        """Get all tasks with pagination"""
-        tasks_collection = await get_collection("tasks")
-        
-        # Calculate skip for pagination
-        skip = (page - 1) * limit
+    async def get_all_tasks(
+        self,
+        page: int = 1,
+        limit: int = 10,
+        after: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """Get all tasks with pagination, newest first
+
+        Pages come from the list cache; a stale page is returned as is while
+        a single background refresh replaces it.
+        """
+        key = (page, limit, after)
+        cached = _task_list_cache.get(key)
+        refresh = _task_list_refreshing.get(key)
+        if cached is None:
+            # Wait for the page's query in flight rather than starting another
+            if refresh is None:
+                refresh = self._start_list_refresh(key)
+            tasks, total, next_cursor = await asyncio.shield(refresh)
+            return list(tasks), total, next_cursor
         
-        # Count total tasks
-        total = await tasks_collection.count_documents({})
+        stale_at, (tasks, total, next_cursor) = cached
+        if stale_at < time.monotonic() and refresh is None:
+            self._start_list_refresh(key)
+        return list(tasks), total, next_cursor
+
+    def _start_list_refresh(self, key: Tuple[int, int, Optional[str]]) -> "asyncio.Task[Any]":
+        refresh = asyncio.create_task(self._refresh_task_list(key))
+        _task_list_refreshing[key] = refresh
+        return refresh
+
+    async def _refresh_task_list(
+        self,
+        key: Tuple[int, int, Optional[str]]
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """Load a list page from the database and store it in the list cache"""
+        try:
+            result = await self._load_task_list(*key)
+            if _task_list_refreshing.get(key) is asyncio.current_task():
+                stale_at = time.monotonic() + settings.TASK_LIST_CACHE_FRESH_SECONDS
+                _task_list_cache.set(key, (stale_at, result))
+            return result
+        finally:
+            if _task_list_refreshing.get(key) is asyncio.current_task():
+                del _task_list_refreshing[key]
+
+    async def _load_task_list(
+        self,
+        page: int,
+        limit: int,
+        after: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """Query one page of tasks
+
+        Args:
+            page: Page number, used with skip/limit when after is not given
+            limit: Items per page
+            after: Cursor from a previous page's next_cursor; continues after
+                   that task using the (created_at, _id) index instead of skipping
+
+        Returns:
+            The page of tasks, the total number of tasks and the cursor for
+            the next page (None on the last page)
+        """
+        tasks_collection = await get_collection("tasks")
         
-        # Use aggregation to join with files collection
-        pipeline = [
+        # Join files only for the tasks on this page, and reduce the joined
+        # file and column list to what the list shows before they are sent
+        # over the wire
+        page_stages: List[Dict[str, Any]] = [
             {
                 "$addFields": {
                     "file_id_obj": {"$toObjectId": "$file_id"}
@@ -52,18 +214,58 @@ class TaskRepository:
                 }
             },
             {
-                "$sort": {"created_at": -1}
-            },
-            {
-                "$skip": skip
+                "$addFields": {
+                    "original_filename": {"$ifNull": ["$file_info.original_filename", ""]},
+                    "total_columns": {"$size": {"$ifNull": ["$column_names", []]}}
+                }
             },
             {
-                "$limit": limit
+                "$project": {
+                    "file_info": 0,
+                    "file_id_obj": 0,
+                    "column_names": 0
+                }
             }
         ]
+        sort_stage = {"$sort": {"created_at": -1, "_id": -1}}
         
-        cursor = tasks_collection.aggregate(pipeline)
-        tasks = await cursor.to_list(length=limit)
+        position = _decode_task_cursor(after)
+        if position is not None:
+            # Keyset page: an index range scan from the cursor, whatever the depth
+            created_at, object_id = position
+            pipeline = [
+                {
+                    "$match": {"$or": [
+                        {"created_at": {"$lt": created_at}},
+                        {"created_at": created_at, "_id": {"$lt": object_id}}
+                    ]}
+                },
+                sort_stage,
+                {"$limit": limit},
+                *page_stages
+            ]
+            async with query_slot():
+                tasks, total = await asyncio.gather(
+                    tasks_collection.aggregate(pipeline).to_list(length=limit),
+                    tasks_collection.estimated_document_count()
+                )
+        else:
+            # Count and fetch the page in one aggregation
+            pipeline = [
+                sort_stage,
+                {
+                    "$facet": {
+                        "data": [{"$skip": (page - 1) * limit}, {"$limit": limit}, *page_stages],
+                        "total": [{"$count": "count"}]
+                    }
+                }
+            ]
+            async with query_slot():
+                [result] = await tasks_collection.aggregate(pipeline).to_list(length=1)
+            tasks = result["data"]
+            total = result["total"][0]["count"] if result["total"] else 0
+        
+        next_cursor = _encode_task_cursor(tasks[-1]) if len(tasks) == limit else None
         
         # Convert ObjectId and datetime to string
         for task in tasks:
@@ -72,85 +274,52 @@ class TaskRepository:
             task["updated_file_date"] = task["updated_file_date"].strftime("%Y-%m-%d")
             task["created_at"] = task["created_at"].isoformat()
             task["updated_at"] = task["updated_at"].isoformat()
-            task["total_columns"] = len(task["column_names"])
-            # Add original_filename from joined file_info
-            if "file_info" in task and task["file_info"]:
-                task["original_filename"] = task["file_info"].get("original_filename", "")
-            else:
-                task["original_filename"] = ""
-            # Remove column_names, file_info, and temporary field from response
-            task.pop("column_names", None)
-            task.pop("file_info", None)
-            task.pop("file_id_obj", None)
-        
-        return tasks, total
+        
+        return tasks, total, next_cursor
 
     async def get_task_by_id(self, task_id: str) -> Optional[Dict[str, Any]]:
-        """Get task by ID"""
-        tasks_collection = await get_collection("tasks")
-        
-        if not ObjectId.is_valid(task_id):
-            return None
-        
-        # Use aggregation to join with files collection
-        pipeline = [
-            {
-                "$match": {"_id": ObjectId(task_id)}
-            },
-            {
-                "$addFields": {
-                    "file_id_obj": {"$toObjectId": "$file_id"}
-                }
-            },
-            {
-                "$lookup": {
-                    "from": "files",
-                    "localField": "file_id_obj",
-                    "foreignField": "_id",
-                    "as": "file_info"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$file_info",
-                    "preserveNullAndEmptyArrays": True
-                }
-            }
-        ]
-        
-        cursor = tasks_collection.aggregate(pipeline)
-        result = await cursor.to_list(length=1)
+        """Get task by ID (served from the task cache when possible)"""
+        # Cache, loads and batch results are keyed by the lowercase form that
+        # str(ObjectId) produces, so uppercase ids find the same task
+        task_id = task_id.lower()
+        cached = _task_cache.get(task_id)
+        if cached is not None:
+            return dict(cached)
         
-        if not result:
+        if not is_valid_object_id(task_id):
             return None
-            
-        task = result[0]
-        task["_id"] = str(task["_id"])
-        # Handle both string and datetime dates
-        if isinstance(task["created_file_date"], datetime):
-            task["created_file_date"] = task["created_file_date"].strftime("%Y-%m-%d")
-        if isinstance(task["updated_file_date"], datetime):
-            task["updated_file_date"] = task["updated_file_date"].strftime("%Y-%m-%d")
-        task["created_at"] = task["created_at"].isoformat()
-        task["updated_at"] = task["updated_at"].isoformat()
-        
-        # Add original_filename from joined file_info
-        if "file_info" in task and task["file_info"]:
-            task["original_filename"] = task["file_info"].get("original_filename", "")
-        else:
-            task["original_filename"] = ""
         
-        # Remove file_info and temporary field from response
-        task.pop("file_info", None)
-        task.pop("file_id_obj", None)
-        
-        return task
+        # Only one database read per task at a time; other callers wait for it
+        load = _task_loads.get(task_id)
+        if load is None:
+            load = asyncio.create_task(self._load_task(task_id))
+            _task_loads[task_id] = load
+        task = await asyncio.shield(load)
+        return dict(task) if task is not None else None
+
+    async def _load_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Read a task with its file from the database and cache it"""
+        try:
+            task = await _task_batch.load(task_id)
+            if task is not None and _task_loads.get(task_id) is asyncio.current_task():
+                _task_cache.set(task_id, task)
+            return task
+        finally:
+            if _task_loads.get(task_id) is asyncio.current_task():
+                del _task_loads[task_id]
+
+    def invalidate_cache(self, task_id: str) -> None:
+        """Drop any cached copy of a task, and every list page, after it has been modified"""
+        task_id = task_id.lower()
+        _task_cache.pop(task_id)
+        _task_loads.pop(task_id, None)
+        _invalidate_task_lists()
 
     async def update_task(self, task_id: str, task_update: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Update task"""
         tasks_collection = await get_collection("tasks")
         
-        if not ObjectId.is_valid(task_id):
+        if not is_valid_object_id(task_id):
             raise ValueError("Invalid task_id format")
             
         # Convert Pydantic model to dictionary and filter out None values
@@ -167,6 +336,7 @@ class TaskRepository:
             {"_id": ObjectId(task_id)},
             update_data
         )
+        self.invalidate_cache(task_id)
         
         if result.modified_count == 0:
             raise ValueError("Task not found")
@@ -179,9 +349,10 @@ class TaskRepository:
 
     async def delete_task(self, task_id: str) -> bool:
         """Delete task and all related documents from all collections"""
-        if not ObjectId.is_valid(task_id):
+        if not is_valid_object_id(task_id):
             return False
         
+        self.invalidate_cache(task_id)
         try:
             # Delete from all collections that contain task_id
             collections_to_clean = [
@@ -213,18 +384,18 @@ class TaskRepository:
             print(f"Error deleting task {task_id}: {str(e)}")
             return False
 
-    async def get_pending_tasks(self) -> List[Dict[str, Any]]:
-        """Get all pending tasks (is_done_created_doc=False)"""
+    async def iter_pending_tasks(self) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every pending task (is_done_created_doc=False) as _id and file_id"""
         tasks_collection = await get_collection("tasks")
-        cursor = tasks_collection.find({"is_done_created_doc": False})
-        tasks = await cursor.to_list(length=100)  # Limit to 100 pending tasks
-        return list_serial(tasks)
+        cursor = tasks_collection.find({"is_done_created_doc": False}, {"file_id": 1})
+        async for task in cursor:
+            yield individual_serial(task)
     
     async def update_task_status(self, task_id: str, is_done_created_doc: bool, 
                              column_names: List[str], error_message: Optional[str],
                              processing_time: Optional[float] = None, total_rows: Optional[int] = None, user_id: str = "worker") -> None:
         """Update task status after processing"""
-        if not ObjectId.is_valid(task_id):
+        if not is_valid_object_id(task_id):
             raise ValueError("Invalid task_id format")
             
         tasks_collection = await get_collection("tasks")
@@ -247,3 +418,4 @@ class TaskRepository:
             {"_id": ObjectId(task_id)},
             {"$set": update_data}
         )
+        self.invalidate_cache(task_id)
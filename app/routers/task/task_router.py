@@ -3,7 +3,8 @@ from app.routers.task.task_service import TaskService
 from app.routers.task.task_model import TaskCreate, TaskUpdate
 from app.utils.advanced_performance import tracker
 from app.dependencies.auth import require_user
-from app.api.schemas import PaginationResponse
+from app.api.schemas import PaginationResponse, PaginatedJSONResponse
+from app.utils.object_id import OBJECT_ID_REGEX
 from typing import Dict, Any, Optional
 
 router = APIRouter(
@@ -34,15 +35,20 @@ async def create_task(task: TaskCreate, current_user: Any = Depends(require_user
 
 @router.get("/", response_model=PaginationResponse[Dict[str, Any]])
 @tracker.measure_async_time
-async def get_all_tasks(page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=100), current_user: Any = Depends(require_user)) -> Dict[str, Any]:
+async def get_all_tasks(
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+    after: Optional[str] = Query(None, description="next_cursor จากหน้าก่อนหน้า (ใช้แทน page)"),
+    current_user: Any = Depends(require_user)
+) -> PaginatedJSONResponse:
     """
     📋 ดึงรายการงานทั้งหมด
     """
-    return await task_service.get_all_tasks(page, limit)
+    return PaginatedJSONResponse(await task_service.get_all_tasks(page, limit, after))
 
 @router.get("/{task_id}")
 @tracker.measure_async_time
-async def get_task(task_id: str = Path(..., description="ID ของงานที่ต้องการดึงข้อมูล"), current_user: Any = Depends(require_user)) -> Optional[Dict[str, Any]]:
+async def get_task(task_id: str = Path(..., regex=OBJECT_ID_REGEX, description="ID ของงานที่ต้องการดึงข้อมูล"), current_user: Any = Depends(require_user)) -> Optional[Dict[str, Any]]:
     """
     📝 ดึงข้อมูลงานตาม ID
     """
@@ -50,7 +56,7 @@ async def get_task(task_id: str = Path(..., description="ID ของงาน
 
 @router.put("/{task_id}")
 @tracker.measure_async_time
-async def update_task(task_id: str, task_update: TaskUpdate, current_user: Any = Depends(require_user)) -> Dict[str, Any]:
+async def update_task(task_update: TaskUpdate, task_id: str = Path(..., regex=OBJECT_ID_REGEX), current_user: Any = Depends(require_user)) -> Dict[str, Any]:
     """
     🔄 อัปเดตข้อมูลงานตาม ID
     """
@@ -58,7 +64,7 @@ async def update_task(task_id: str, task_update: TaskUpdate, current_user: Any =
 
 @router.delete("/{task_id}")
 @tracker.measure_async_time
-async def delete_task(task_id: str = Path(..., description="ID ของงานที่ต้องการลบ"), current_user: Any = Depends(require_user)) -> bool:
+async def delete_task(task_id: str = Path(..., regex=OBJECT_ID_REGEX, description="ID ของงานที่ต้องการลบ"), current_user: Any = Depends(require_user)) -> bool:
     """
     ลบงานตาม ID
     """
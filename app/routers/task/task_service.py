@@ -1,11 +1,10 @@
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from bson import ObjectId # type: ignore
-from app.routers.task.task_repository import TaskRepository
+from app.routers.task.task_repository import TaskRepository, format_task
 from app.routers.task.task_model import TaskCreate, TaskUpdate
 from app.routers.file.file_repository import FileRepository
 from app.exceptions import TaskException
-from functools import lru_cache
+from app.utils.object_id import is_valid_object_id
 from concurrent.futures import ThreadPoolExecutor
 import asyncio
 import pandas as pd
@@ -22,7 +21,6 @@ class TaskService:
         self.task_repository: TaskRepository = TaskRepository()
         self.file_repository: FileRepository = FileRepository()
 
-    @lru_cache(maxsize=128)
     async def get_cached_file(self, file_id: str) -> Optional[Dict[str, Any]]:
         """Get file with caching"""
         if file_id in cached_files:
@@ -35,7 +33,7 @@ class TaskService:
     async def create_task(self, task: TaskCreate, user_id: str) -> Dict[str, Any]:
         """Create a new task with optimized performance"""
         # Validate file_id
-        if not ObjectId.is_valid(task.file_id):
+        if not is_valid_object_id(task.file_id):
             raise TaskException("Invalid file_id format")
         
         # Get file with caching
@@ -64,17 +62,14 @@ class TaskService:
             "file_id": task.file_id,
             "is_done_created_doc": False,
             "column_names": [],
-            "error_message": None,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
+            "error_message": None
         }
 
-        # Create task
+        # Create task (the repository stamps the audit fields); the response is
+        # built from the inserted document and the file we already have instead
+        # of reading the task back
         task_id = await self.task_repository.create_task(task_data, user_id)
-        created_task = await self.task_repository.get_task_by_id(task_id)
-        
-        if created_task is None:
-            raise TaskException("Failed to retrieve created task")
+        created_task = format_task({**task_data, "_id": task_id, "file_info": file})
         
         # Add task to processing queue
         from app.workers.background_worker import add_task_to_queue
@@ -93,14 +88,15 @@ class TaskService:
         # Combine chunks
         return pd.concat(chunks, ignore_index=True)
 
-    async def get_all_tasks(self, page: int = 1, limit: int = 10) -> Dict[str, Any]:
-        """Get all tasks with pagination"""
-        tasks, total = await self.task_repository.get_all_tasks(page, limit)
+    async def get_all_tasks(self, page: int = 1, limit: int = 10, after: Optional[str] = None) -> Dict[str, Any]:
+        """Get all tasks with pagination (keyset when after is given)"""
+        tasks, total, next_cursor = await self.task_repository.get_all_tasks(page, limit, after)
         return {
             "list": tasks,
             "total": total,
             "page": page,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": next_cursor
         }
 
     async def get_task_by_id(self, task_id: str) -> Optional[Dict[str, Any]]:
@@ -1,8 +1,74 @@
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterable, Tuple, Union
 from datetime import datetime
-from bson import ObjectId # type: ignore
+from functools import lru_cache
+import hashlib
+import logging
+from bson import Binary, ObjectId # type: ignore
+from pymongo import ReturnDocument, UpdateOne
 from app.database import get_collection
+from app.config import get_settings
+from app.utils.cache import TTLCache
 from app.utils.serializers import list_serial, individual_serial
+from app.utils.object_id import is_valid_object_id
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Shared by every UserRepository instance; invalidated on update/delete
+_user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+# Sensitive fields left out of user reads unless explicitly requested
+_PUBLIC_PROJECTION = {
+    "password": 0,
+    "email_verification_token": 0,
+    "email_verification_expires": 0,
+    "password_reset_token": 0,
+    "password_reset_expires": 0
+}
+
+# The user list also leaves out login_history (up to 100 entries per user);
+# it is only returned when fetching a single user
+_LIST_PROJECTION = {**_PUBLIC_PROJECTION, "login_history": 0}
+
+def hash_token(token: str) -> Binary:
+    """SHA-256 digest of an emailed token; only the digest is stored in the database"""
+    return Binary(hashlib.sha256(token.encode()).digest())
+
+def _token_query(token: str) -> Dict[str, Any]:
+    """Match a hashed token, or a plaintext one stored before tokens were hashed"""
+    return {"$in": [hash_token(token), token]}
+
+def _fields_projection(fields: Optional[Iterable[str]]) -> Dict[str, int]:
+    """Projection for the requested fields, or everything except sensitive ones"""
+    if fields is None:
+        return _PUBLIC_PROJECTION
+    # Always name _id so an empty field list does not mean "all fields"
+    return {"_id": 1, **{field: 1 for field in fields}}
+
+def _as_object_id(user_id: Union[str, ObjectId]) -> Optional[ObjectId]:
+    """Return user_id as an ObjectId, or None if it is not a valid id"""
+    if isinstance(user_id, ObjectId):
+        return user_id
+    return ObjectId(user_id) if is_valid_object_id(user_id) else None
+
+def _audit_fields(updated_by: str) -> Dict[str, Any]:
+    """Return the updated_by/updated_at fields every user write stamps
+
+    updated_at uses local time like created_at; only token expiries are UTC.
+    """
+    return {"updated_by": updated_by, "updated_at": datetime.now()}
+
+def _with_audit(update_data: Dict[str, Any], updated_by: str) -> Dict[str, Any]:
+    """Add the audit fields to an update without dropping its other operators
+
+    A plain field dict (no $ operators) is treated as a $set.
+    """
+    if not any(key.startswith("$") for key in update_data):
+        update_data = {"$set": update_data}
+    update_operation = dict(update_data)
+    update_operation["$set"] = {**update_data.get("$set", {}), **_audit_fields(updated_by)}
+    return update_operation
 
 class UserRepository:
     async def create(self, user_data: Dict[str, Any], created_by: str = "system") -> Dict[str, Any]:
@@ -10,38 +76,103 @@ class UserRepository:
         users_collection = await get_collection("users")
         
         # Add audit fields
+        audit = _audit_fields(created_by)
         user_data.update({
             "created_by": created_by,
-            "created_at": datetime.now(),
-            "updated_by": created_by,
-            "updated_at": datetime.now()
+            "created_at": audit["updated_at"],
+            **audit
         })
         
         result = await users_collection.insert_one(user_data)
         user_data["_id"] = str(result.inserted_id)
         return user_data
 
-    async def find_by_id(self, user_id: str, include_password: bool = False) -> Optional[Dict[str, Any]]:
-        """Get user by ID"""
-        if not ObjectId.is_valid(user_id):
+    async def find_by_id(
+        self,
+        user_id: Union[str, ObjectId],
+        include_password: bool = False,
+        fields: Optional[Iterable[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get user by ID
+
+        The password hash and verification/reset tokens are only returned
+        when include_password is True.
+
+        Args:
+            user_id: The ID of the user
+            include_password: Also return the password hash (and tokens)
+            fields: If given, only these fields (plus _id) are fetched and the
+                    cache is bypassed
+        """
+        # Only valid ids are ever cached, so a hit needs no ObjectId decode;
+        # keys use the lowercase form str(ObjectId) gives, as invalidate_cache does
+        cache_key = str(user_id).lower()
+        if fields is None and not include_password:
+            cached = _user_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+
+        object_id = _as_object_id(user_id)
+        if object_id is None:
             return None
 
         users_collection = await get_collection("users")
-        projection = None if include_password else {"password": 0}
-        user = await users_collection.find_one({"_id": ObjectId(user_id)}, projection)
+        projection: Optional[Dict[str, int]]
+        if fields is not None:
+            projection = _fields_projection(fields)
+            if include_password:
+                projection["password"] = 1
+        else:
+            projection = None if include_password else _PUBLIC_PROJECTION
+        user = await users_collection.find_one({"_id": object_id}, projection)
         if user:
             if include_password:
                 # Convert ObjectId to string manually when including password
                 user["_id"] = str(user["_id"])
                 return user
             else:
-                return individual_serial(user)
+                serialized = individual_serial(user)
+                if fields is None:
+                    _user_cache.set(cache_key, serialized)
+                return dict(serialized)
         return None
 
-    async def find_by_username(self, username: str, include_password: bool = False) -> Optional[Dict[str, Any]]:
-        """Get user by username"""
+    async def delete_user(self, user_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+        """Delete a user and return the deleted document, or None if there was none
+
+        The password hash and tokens are left out of the returned document.
+        """
+        object_id = _as_object_id(user_id)
+        if object_id is None:
+            return None
+        users_collection = await get_collection("users")
+        user = await users_collection.find_one_and_delete({"_id": object_id}, projection=_PUBLIC_PROJECTION)
+        self.invalidate_cache(object_id)
+        return individual_serial(user) if user else None
+
+    def invalidate_cache(self, user_id: Union[str, ObjectId]) -> None:
+        """Drop any cached copy of a user after it has been modified"""
+        _user_cache.pop(str(user_id).lower())
+
+    async def find_by_username(
+        self,
+        username: str,
+        include_password: bool = False,
+        fields: Optional[Iterable[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get user by username
+
+        Args:
+            username: The username to look up
+            include_password: Return the whole document, password included
+            fields: If given, only these fields (plus _id) are fetched
+        """
         users_collection = await get_collection("users")
-        projection = None if include_password else {"password": 0}
+        projection: Optional[Dict[str, int]]
+        if fields is not None:
+            projection = _fields_projection(fields)
+        else:
+            projection = None if include_password else {"password": 0}
         user = await users_collection.find_one({"username": username}, projection)
         if user:
             # Convert ObjectId to string
@@ -49,15 +180,32 @@ class UserRepository:
             return user
         return None
 
-    async def find_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        """Get user by email"""
+    async def find_by_email(self, email: str, fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Get user by email, without the password hash and tokens
+
+        Args:
+            email: The email address to look up
+            fields: If given, only these fields (plus _id) are fetched
+        """
         users_collection = await get_collection("users")
-        user = await users_collection.find_one({"email": email}, {"password": 0})
+        user = await users_collection.find_one({"email": email}, _fields_projection(fields))
         if user:
             return individual_serial(user)
         return None
 
-    async def update_user(self, user_id: str, update_data: Dict[str, Any], updated_by: str) -> Optional[str]:
+    async def find_existing_username_or_email(self, username: str, email: str) -> Optional[Dict[str, Any]]:
+        """Find a user that already has this username or email, in one query
+
+        Only _id, username and email are returned so the caller can tell
+        which field conflicts.
+        """
+        users_collection = await get_collection("users")
+        return await users_collection.find_one(
+            {"$or": [{"username": username}, {"email": email}]},
+            {"_id": 1, "username": 1, "email": 1}
+        )
+
+    async def update_user(self, user_id: Union[str, ObjectId], update_data: Dict[str, Any], updated_by: str) -> Optional[str]:
         """Update user information
         
         Args:
@@ -66,71 +214,229 @@ class UserRepository:
                        Must be a MongoDB update operation (e.g., {'$set': {...}}, {'$push': {...}})
             updated_by: User ID of who is making the update
         """
-        if not ObjectId.is_valid(user_id):
+        object_id = _as_object_id(user_id)
+        if object_id is None:
             return None
 
         users_collection = await get_collection("users")
-        
-        # Ensure the update operation is valid
-        if not any(key.startswith('$') for key in update_data.keys()):
-            # If no operators found, wrap in $set
-            update_fields = update_data
-        else:
-            # Extract fields from $set operation if it exists
-            update_fields = update_data.get('$set', {})
-        
-        # Add audit fields
-        update_fields.update({
-            "updated_by": updated_by,
-            "updated_at": datetime.now()
-        })
-        
-        update_operation = {"$set": update_fields}
+        update_operation = _with_audit(update_data, updated_by)
             
         try:
             result = await users_collection.update_one(
-                {"_id": ObjectId(user_id)},
+                {"_id": object_id},
                 update_operation
             )
+            self.invalidate_cache(object_id)
             
+            # matched_count already confirms the user exists; no need to refetch it
             if result.matched_count == 0:
                 return None
-                
-            updated_user = await users_collection.find_one({"_id": ObjectId(user_id)})
-            if updated_user:
-                return "Update user successfully"
-            return None
+            return "Update user successfully"
             
-        except Exception as e:
-            # Log the error for debugging
-            print(f"Error updating user {user_id}: {str(e)}")
+        except Exception:
+            logger.exception(f"Error updating user {user_id}")
             raise
 
-    async def get_all_users(self, page: int = 1, limit: int = 10) -> Dict[str, Any]:
-        """Get all users with pagination"""
+    async def find_one_and_update(self, user_id: Union[str, ObjectId], update_data: Dict[str, Any], updated_by: str) -> Optional[Dict[str, Any]]:
+        """Apply an update and return the updated user in a single round-trip
+
+        Args:
+            user_id: The ID of the user to update
+            update_data: A MongoDB update operation (e.g., {'$set': {...}})
+            updated_by: User ID of who is making the update
+
+        Raises:
+            DuplicateKeyError: If the update violates a unique index (username/email)
+        """
+        object_id = _as_object_id(user_id)
+        if object_id is None:
+            return None
+
+        users_collection = await get_collection("users")
+
+        user = await users_collection.find_one_and_update(
+            {"_id": object_id},
+            _with_audit(update_data, updated_by),
+            projection=_PUBLIC_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        self.invalidate_cache(object_id)
+        return individual_serial(user) if user else None
+
+    async def get_all_users(self, page: int = 1, limit: int = 10, after_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get all users with pagination, newest first
+
+        Args:
+            page: Page number, used with skip/limit when after_id is not given
+            limit: Items per page
+            after_id: Cursor from a previous page's next_cursor; continues
+                      after that user using the _id index instead of skipping
+        """
         users_collection = await get_collection("users")
         
-        skip = (page - 1) * limit
         total = await users_collection.count_documents({})
         
-        cursor = users_collection.find({}, {"password": 0}).sort("created_at", -1).skip(skip).limit(limit)
-        users = await cursor.to_list(length=limit)
+        query: Dict[str, Any] = {}
+        if is_valid_object_id(after_id):
+            query["_id"] = {"$lt": ObjectId(after_id)}
+        
+        cursor = users_collection.find(query, _LIST_PROJECTION).sort("_id", -1)
+        if not query:
+            cursor = cursor.skip((page - 1) * limit)
+        users = await cursor.limit(limit).to_list(length=limit)
         
         return {
             "list": list_serial(users),
             "total": total,
             "page": page,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": str(users[-1]["_id"]) if len(users) == limit else None
         }
     
-    async def find_by_verification_token(self, token: str) -> Optional[Dict[str, Any]]:
-        """Find user by email verification token"""
+    async def find_by_verification_token(
+        self,
+        token: str,
+        valid_at: Optional[datetime] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Find user by email verification token
+
+        Args:
+            token: The verification token sent by email
+            valid_at: If given, only match tokens that expire after this time
+            fields: If given, only these fields (plus _id) are fetched
+        """
         users_collection = await get_collection("users")
-        user = await users_collection.find_one({"email_verification_token": token})
+        query: Dict[str, Any] = {"email_verification_token": _token_query(token)}
+        if valid_at is not None:
+            query["email_verification_expires"] = {"$gt": valid_at}
+        user = await users_collection.find_one(query, _fields_projection(fields))
         return individual_serial(user) if user else None
     
-    async def find_by_reset_token(self, token: str) -> Optional[Dict[str, Any]]:
-        """Find user by password reset token"""
+    async def consume_verification_token(self, token: str, valid_at: datetime, update_fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Atomically apply update_fields to the unverified user holding a valid token
+
+        Matching and updating happen in one find_one_and_update, so a token can
+        only be used once even under concurrent requests.
+
+        Returns:
+            The user as it was before the update, or None if no user matched
+        """
+        users_collection = await get_collection("users")
+        user = await users_collection.find_one_and_update(
+            {
+                "email_verification_token": _token_query(token),
+                "email_verification_expires": {"$gt": valid_at},
+                "is_verify_email": {"$ne": True}
+            },
+            {
+                "$set": {**update_fields, **_audit_fields("system")},
+                # Remove (not null) the used token so it leaves the sparse index
+                "$unset": {"email_verification_token": "", "email_verification_expires": ""}
+            },
+            projection=_PUBLIC_PROJECTION,
+            return_document=ReturnDocument.BEFORE
+        )
+        if not user:
+            return None
+        self.invalidate_cache(str(user["_id"]))
+        return individual_serial(user)
+    
+    async def issue_verification_token(
+        self,
+        user_id: Union[str, ObjectId],
+        token_hash: Binary,
+        expires_at: datetime
+    ) -> Optional[Dict[str, Any]]:
+        """Set a new verification token on an unverified user in one atomic update
+
+        Returns:
+            The user's _id, email, username and first_name, or None if the
+            user does not exist or is already verified
+        """
+        object_id = _as_object_id(user_id)
+        if object_id is None:
+            return None
+        users_collection = await get_collection("users")
+        user = await users_collection.find_one_and_update(
+            {"_id": object_id, "is_verify_email": {"$ne": True}},
+            {"$set": {
+                "email_verification_token": token_hash,
+                "email_verification_expires": expires_at,
+                **_audit_fields("system")
+            }},
+            projection={"email": 1, "username": 1, "first_name": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not user:
+            return None
+        self.invalidate_cache(object_id)
+        return individual_serial(user)
+    
+    async def find_unverified_by_ids(self, user_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get the users among user_ids whose email is not verified yet"""
+        object_ids = [ObjectId(user_id) for user_id in user_ids if is_valid_object_id(user_id)]
+        if not object_ids:
+            return []
         users_collection = await get_collection("users")
-        user = await users_collection.find_one({"password_reset_token": token})
+        cursor = users_collection.find(
+            {"_id": {"$in": object_ids}, "is_verify_email": {"$ne": True}},
+            {"email": 1, "username": 1, "first_name": 1}
+        )
+        return list_serial(await cursor.to_list(length=len(object_ids)))
+    
+    async def bulk_set_verification_tokens(self, tokens: List[Tuple[str, str, datetime]], updated_by: str = "system") -> int:
+        """Set a new verification token on many users with one bulk_write
+
+        Args:
+            tokens: (user_id, token_hash, expires_at) for each user, where
+                    token_hash comes from hash_token()
+            updated_by: User ID of who is making the update
+
+        Returns:
+            The number of users modified
+        """
+        if not tokens:
+            return 0
+        users_collection = await get_collection("users")
+        audit = _audit_fields(updated_by)
+        operations = [
+            UpdateOne(
+                {"_id": ObjectId(user_id)},
+                {"$set": {
+                    "email_verification_token": token_hash,
+                    "email_verification_expires": expires_at,
+                    **audit
+                }}
+            )
+            for user_id, token_hash, expires_at in tokens
+        ]
+        result = await users_collection.bulk_write(operations, ordered=False)
+        for user_id, _, _ in tokens:
+            self.invalidate_cache(user_id)
+        return result.modified_count
+    
+    async def find_by_reset_token(
+        self,
+        token: str,
+        valid_at: Optional[datetime] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Find user by password reset token
+
+        Args:
+            token: The reset token sent by email
+            valid_at: If given, only match tokens that expire after this time
+            fields: If given, only these fields (plus _id) are fetched
+        """
+        users_collection = await get_collection("users")
+        query: Dict[str, Any] = {"password_reset_token": _token_query(token)}
+        if valid_at is not None:
+            query["password_reset_expires"] = {"$gt": valid_at}
+        user = await users_collection.find_one(query, _fields_projection(fields))
         return individual_serial(user) if user else None
+
+@lru_cache()
+def get_user_repository() -> UserRepository:
+    """Process-wide UserRepository"""
+    return UserRepository()
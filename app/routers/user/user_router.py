@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Query, Path, Depends, HTTPException
-from app.routers.user.user_service import UserService
+from fastapi import APIRouter, BackgroundTasks, Query, Path, Depends, HTTPException
+from app.routers.user.user_service import get_user_service
 from app.routers.user.user_model import UserCreate, UserUpdate, ChangePasswordRequest, VerifyEmailRequest, ForgotPasswordRequest, ResetPasswordRequest
 from app.utils.advanced_performance import tracker
-from app.dependencies.auth import require_admin, require_user, get_current_user
-from bson import ObjectId # type: ignore
-from app.api.schemas import PaginationResponse
+from app.dependencies.auth import require_admin, require_user
+from app.api.schemas import PaginationResponse, PaginatedJSONResponse
+from app.utils.object_id import OBJECT_ID_REGEX
 from typing import Dict, Any, Optional
 
 router = APIRouter(
@@ -14,19 +14,19 @@ router = APIRouter(
 )
 
 # Initialize service
-user_service = UserService()
+user_service = get_user_service()
 
 @router.post("/")
 @tracker.measure_async_time
-async def create_user(user: UserCreate, current_user: Any = Depends(require_admin)) -> Dict[str, Any]:
+async def create_user(user: UserCreate, background_tasks: BackgroundTasks, current_user: Any = Depends(require_admin)) -> Dict[str, Any]:
     """
     📋 สร้างผู้ใช้ใหม่ (เฉพาะ Admin)
     """
-    return await user_service.create_user(user, current_user.user_id)
+    return await user_service.create_user(user, current_user.user_id, background_tasks)
 
 @router.patch("/{user_id}")
 @tracker.measure_async_time
-async def update_user(user_id: str, user_update: UserUpdate, current_user: Any = Depends(require_user)) -> Dict[str, Any]:
+async def update_user(user_update: UserUpdate, user_id: str = Path(..., regex=OBJECT_ID_REGEX), current_user: Any = Depends(require_user)) -> Dict[str, Any]:
     """
     อัปเดตข้อมูลผู้ใช้ (Admin สามารถแก้ไขทุกคน, User สามารถแก้ไขตัวเองได้)
     """
@@ -42,7 +42,7 @@ async def update_user(user_id: str, user_update: UserUpdate, current_user: Any =
 @router.get("/{user_id}")
 @tracker.measure_async_time
 async def get_user(
-    user_id: str = Path(..., description="ID ของผู้ใช้ที่ต้องการดึงข้อมูล"),
+    user_id: str = Path(..., regex=OBJECT_ID_REGEX, description="ID ของผู้ใช้ที่ต้องการดึงข้อมูล"),
     current_user: Any = Depends(require_user)
 ) -> Dict[str, Any]:
     """
@@ -59,58 +59,41 @@ async def get_user(
 async def get_all_users(
     page: int = Query(1, ge=1), 
     limit: int = Query(10, ge=1, le=100),
+    after_id: Optional[str] = Query(None, description="ค่า next_cursor จากหน้าก่อนหน้า"),
     current_user: Any = Depends(require_user)
-) -> Dict[str, Any]:
+) -> PaginatedJSONResponse:
     """
     ดึงรายการผู้ใช้
     - Admin: ดูได้ทุกคน
     - User: ดูได้เฉพาะตัวเอง
     """
     if "admin" in current_user.roles:
-        return await user_service.get_all_users(page, limit)
+        return PaginatedJSONResponse(await user_service.get_all_users(page, limit, after_id))
     else:
         # Users can only view their own data
         user = await user_service.get_user(current_user.user_id)
         if user:
-            return {
+            return PaginatedJSONResponse({
                 "list": [user],
                 "total": 1,
                 "page": page,
                 "limit": limit
-            }
+            })
         raise HTTPException(status_code=404, detail="User not found")
 
 @router.delete("/{user_id}")
 @tracker.measure_async_time
-async def delete_user(user_id: str = Path(..., description="ID ของผู้ใช้ที่ต้องการลบ"), current_user: Any = Depends(require_admin)) -> Dict[str, Any]:
+async def delete_user(user_id: str = Path(..., regex=OBJECT_ID_REGEX, description="ID ของผู้ใช้ที่ต้องการลบ"), current_user: Any = Depends(require_admin)) -> Dict[str, Any]:
     """
     ลบผู้ใช้ (เฉพาะ Admin)
     """
-    # Validate user_id
-    if not ObjectId.is_valid(user_id):
-        raise HTTPException(status_code=400, detail="Invalid user ID format")
-    
-    # Check if user exists
-    user = await user_service.get_user(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="🔍 ไม่พบผู้ใช้ที่ต้องการลบ")
-    
-    # Delete user
-    # Note: We need to add delete_user method to UserService
-    from app.database import get_collection
-    from app.utils.serializers import individual_serial
-    
-    users_collection = await get_collection("users")
-    result = await users_collection.delete_one({"_id": ObjectId(user_id)})
-    
-    # Check if delete was successful
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=500, detail="⚠️ เกิดข้อผิดพลาดในการลบข้อมูล")
+    # Delete and get the deleted user back in one round-trip (404 if missing)
+    user = await user_service.delete_user(user_id)
     
     # Return deleted user data
     return {
         "message": "🗑️ ลบข้อมูลผู้ใช้สำเร็จ",
-        "deleted_user": individual_serial(user)
+        "deleted_user": user
     }
 
 @router.post("/verify-email")
@@ -123,19 +106,19 @@ async def verify_email(verify_request: VerifyEmailRequest) -> Dict[str, Any]:
 
 @router.post("/{user_id}/resend-verification")
 @tracker.measure_async_time
-async def resend_verification_email(user_id: str, current_user: Any = Depends(require_admin)) -> Dict[str, Any]:
+async def resend_verification_email(background_tasks: BackgroundTasks, user_id: str = Path(..., regex=OBJECT_ID_REGEX), current_user: Any = Depends(require_admin)) -> Dict[str, Any]:
     """
     📧 Resend email verification (Admin only)
     """
-    return await user_service.resend_verification_email(user_id)
+    return await user_service.resend_verification_email(user_id, background_tasks)
 
 @router.post("/forgot-password")
 @tracker.measure_async_time
-async def forgot_password(request: ForgotPasswordRequest) -> Dict[str, Any]:
+async def forgot_password(request: ForgotPasswordRequest, background_tasks: BackgroundTasks) -> Dict[str, Any]:
     """
     🔐 Send password reset email
     """
-    return await user_service.forgot_password(request)
+    return await user_service.forgot_password(request, background_tasks)
 
 @router.post("/reset-password")
 @tracker.measure_async_time
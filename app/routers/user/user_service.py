@@ -1,36 +1,121 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List, Set, Tuple, Coroutine, NoReturn
+from functools import lru_cache
 from datetime import datetime, timedelta
 from bson import ObjectId # type: ignore
-import secrets
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import base64
+import os
 import logging
-from app.routers.user.user_repository import UserRepository
+import time
+from fastapi import BackgroundTasks
+from app.routers.user.user_repository import UserRepository, get_user_repository, hash_token
+from app.utils.object_id import is_valid_object_id
 from app.routers.user.user_model import UserCreate, UserUpdate, ChangePasswordRequest, VerifyEmailRequest, ForgotPasswordRequest, ResetPasswordRequest
 from app.exceptions import UserException
 from app.routers.auth.auth_model import TokenData
-from app.routers.email.email_service import EmailService
+from app.routers.auth.auth_service import AuthService, get_auth_service, run_password_hash
+from app.routers.email.email_model import EmailTaskCreate, EmailPriority
+from app.routers.email.email_templates import (
+    ACCOUNT_SETUP_SUBJECT, ACCOUNT_SETUP_TEXT, ACCOUNT_SETUP_HTML,
+    PASSWORD_RESET_SUBJECT, PASSWORD_RESET_TEXT, PASSWORD_RESET_HTML
+)
 from app.config import get_settings
+from app.routers.email.email_service import EmailService, get_email_service
+from app.workers.background_worker import add_email_to_queue, add_emails_to_queue
 
 logger = logging.getLogger(__name__)
 
+# Token lifetimes
+_VERIFY_TTL = timedelta(hours=24)
+_RESET_TTL = timedelta(hours=1)
+
+def _new_token() -> str:
+    """Return a random 192-bit URL-safe token (same format as secrets.token_urlsafe(24))"""
+    return base64.urlsafe_b64encode(os.urandom(24)).decode("ascii")
+
+# Keep references to fire-and-forget tasks so they are not garbage collected
+_background_tasks: Set["asyncio.Task[Any]"] = set()
+
+def _background_task_done(task: "asyncio.Task[Any]") -> None:
+    """Forget a finished task and log anything it raised"""
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background task failed", exc_info=task.exception())
+
+def _run_in_background(coro: Coroutine[Any, Any, Any]) -> None:
+    """Schedule a coroutine without awaiting it"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_task_done)
+
+def _schedule(background_tasks: Optional[BackgroundTasks], func: Callable[..., Coroutine[Any, Any, Any]], *args: Any) -> None:
+    """Run func(*args) after the response is sent, or as a task when there is no request"""
+    if background_tasks is not None:
+        background_tasks.add_task(func, *args)
+    else:
+        _run_in_background(func(*args))
+
+# Running average of how long forgot_password takes for a known email, used
+# to pad the unknown-email path so response times do not reveal which
+# addresses are registered
+_forgot_password_seconds = 0.0
+
+def _record_forgot_password_time(elapsed: float) -> None:
+    """Fold one known-email forgot_password duration into the running average"""
+    global _forgot_password_seconds
+    if _forgot_password_seconds == 0.0:
+        _forgot_password_seconds = elapsed
+    else:
+        _forgot_password_seconds += (elapsed - _forgot_password_seconds) / 10
+
+def _duplicate_key_field(error: DuplicateKeyError, default: str) -> str:
+    """Return the field name that caused a unique index violation"""
+    key_pattern = (error.details or {}).get("keyPattern") or {}
+    if key_pattern:
+        return next(iter(key_pattern))
+    # Older servers only report the index name, e.g. "index: email_1"
+    message = str(error)
+    for field in ("username", "email"):
+        if f"index: {field}_" in message:
+            return field
+    return default
+
+def _parse_user_id(user_id: str) -> ObjectId:
+    """Convert a user_id to an ObjectId once, raising a 400 if it is malformed"""
+    if not is_valid_object_id(user_id):
+        raise UserException("Invalid user_id format", status_code=400)
+    return ObjectId(user_id)
+
 class UserService:
+    # One shared instance serves every request (see get_user_service); slots
+    # keep attribute access off a per-instance __dict__
+    __slots__ = ("user_repository", "auth_service", "_email_service", "settings", "_frontend_url")
+
     def __init__(self) -> None:
-        self.user_repository: UserRepository = UserRepository()
-        self.email_service: EmailService = EmailService()
+        self.user_repository: UserRepository = get_user_repository()
+        self.auth_service: AuthService = get_auth_service()
+        self._email_service: Optional[EmailService] = None
         self.settings = get_settings()
-
-    async def create_user(self, user: UserCreate, user_id: str) -> Dict[str, Any]:
-        """Create a new user"""
-        # Check for duplicate username
-        if await self.user_repository.find_by_username(user.username):
-            raise UserException("Username already exists", status_code=400)
-        
-        # Check for duplicate email
-        if await self.user_repository.find_by_email(user.email):
-            raise UserException("Email already exists", status_code=400)
-
+        self._frontend_url: str = getattr(self.settings, "FRONTEND_URL", "http://localhost:3000")
+
+    @property
+    def email_service(self) -> EmailService:
+        """Shared EmailService, created on first use so read-only paths never build it"""
+        if self._email_service is None:
+            self._email_service = get_email_service()
+        return self._email_service
+
+    async def create_user(self, user: UserCreate, user_id: str, background_tasks: Optional[BackgroundTasks] = None) -> Dict[str, Any]:
+        """Create a new user
+
+        When background_tasks is given (from the router), the account setup
+        email is queued after the response is sent; otherwise it is scheduled
+        on the event loop.
+        """
         # Generate email verification token
-        verification_token = secrets.token_urlsafe(32)
-        verification_expires = datetime.utcnow() + timedelta(hours=24)  # 24 hour expiry
+        verification_token = _new_token()
+        verification_expires = datetime.utcnow() + _VERIFY_TTL
         
         # Prepare user data (no password initially)
         user_data = {
@@ -43,19 +128,21 @@ class UserService:
             "is_active": True,
             "is_locked": False,
             "is_verify_email": False,
-            "email_verification_token": verification_token,
+            "email_verification_token": hash_token(verification_token),
             "email_verification_expires": verification_expires,
-            "failed_login_attempts": 0,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "failed_login_attempts": 0
         }
 
-        # Create user
-        result = await self.user_repository.create(user_data, user_id)
+        # Create user; the username/email unique indexes reject duplicates
+        # without a pre-check query
+        try:
+            result = await self.user_repository.create(user_data, user_id)
+        except DuplicateKeyError as e:
+            raise UserException(f"{(await self._conflicting_field(e, user)).capitalize()} already exists", status_code=400)
         
-        # Send account setup email
+        # Send account setup email without holding up the response
         if result and user.email:
-            await self.send_account_setup_email(user.email, verification_token, user.first_name or user.username)
+            _schedule(background_tasks, self.send_account_setup_email, user.email, verification_token, user.first_name or user.username)
         
         # Return user info with ID
         if result:
@@ -68,61 +155,71 @@ class UserService:
         
         return result
 
+    async def _conflicting_field(self, error: DuplicateKeyError, user: UserCreate) -> str:
+        """Return "username" or "email" for a duplicate key error on insert
+
+        Servers that do not name the violated index in the error are resolved
+        with one lookup, which only runs on this failure path.
+        """
+        field = _duplicate_key_field(error, "")
+        if field:
+            return field
+        existing = await self.user_repository.find_existing_username_or_email(user.username, user.email)
+        if existing and existing.get("username") == user.username:
+            return "username"
+        return "email"
+
     async def update_user(self, user_id: str, user_update: UserUpdate, acting_user_id: str) -> Optional[Dict[str, Any]]:
         """Update user information"""
         # Validate user_id
-        if not ObjectId.is_valid(user_id):
-            raise UserException("Invalid user_id format", status_code=400)
+        object_id = _parse_user_id(user_id)
 
-        # Get existing user
-        existing_user = await self.user_repository.find_by_id(user_id)
-        if not existing_user:
-            raise UserException("User not found", status_code=404)
+        # Only the fields the client sent; unset ones must not be overwritten with None
+        update_data = user_update.dict(exclude_unset=True)
 
-        # Prepare update data
-        update_data = user_update.dict(exclude_unset=False)
-        update_data["updated_at"] = datetime.utcnow()
+        # Update and fetch in one round-trip; uniqueness is enforced by the
+        # username/email unique indexes rather than a pre-check query
+        try:
+            updated_user = await self.user_repository.find_one_and_update(object_id, {"$set": update_data}, acting_user_id)
+        except DuplicateKeyError as e:
+            # email is the only unique field UserUpdate can change
+            raise UserException(f"{_duplicate_key_field(e, 'email').capitalize()} already exists", status_code=400)
 
-        # Check for username update and validate uniqueness
-        if "username" in update_data:
-            if update_data["username"] != existing_user["username"]:
-                existing_username = await self.user_repository.find_by_username(update_data["username"])
-                if existing_username and str(existing_username["_id"]) != user_id:
-                    raise UserException("Username already exists", status_code=400)
+        if not updated_user:
+            raise UserException("User not found", status_code=404)
 
-        # Update user
-        result = await self.user_repository.update_user(user_id, {"$set": update_data}, acting_user_id)
-        if not result:
-            return None
-        
-        # Return the updated user data
-        return await self.user_repository.find_by_id(user_id)
+        return updated_user
 
     async def get_user(self, user_id: str) -> Dict[str, Any]:
         """Get user by ID"""
-        if not ObjectId.is_valid(user_id):
+        # Validate only; the repository builds the ObjectId on a cache miss
+        if not is_valid_object_id(user_id):
             raise UserException("Invalid user_id format", status_code=400)
-
         user = await self.user_repository.find_by_id(user_id)
         if not user:
             raise UserException("User not found", status_code=404)
         return user
 
-    async def get_all_users(self, page: int = 1, limit: int = 10) -> Dict[str, Any]:
+    async def delete_user(self, user_id: str) -> Dict[str, Any]:
+        """Delete a user in one round-trip and return the deleted user"""
+        user = await self.user_repository.delete_user(_parse_user_id(user_id))
+        if not user:
+            raise UserException("User not found", status_code=404)
+        return user
+
+    async def get_all_users(self, page: int = 1, limit: int = 10, after_id: Optional[str] = None) -> Dict[str, Any]:
         """Get all users with pagination"""
-        return await self.user_repository.get_all_users(page, limit)
+        return await self.user_repository.get_all_users(page, limit, after_id)
 
     async def change_password(self, user_id: str, password_request: ChangePasswordRequest, acting_user_id: str) -> Dict[str, Any]:
         """Change user password"""
-        from app.routers.auth.auth_service import AuthService
-        auth_service = AuthService()
+        auth_service = self.auth_service
         
         # Validate user_id
-        if not ObjectId.is_valid(user_id):
-            raise UserException("Invalid user_id format", status_code=400)
+        object_id = _parse_user_id(user_id)
 
         # Get existing user with password
-        existing_user = await self.user_repository.find_by_id(user_id, include_password=True)
+        existing_user = await self.user_repository.find_by_id(object_id, include_password=True, fields=())
         if not existing_user:
             raise UserException("User not found", status_code=404)
 
@@ -130,177 +227,123 @@ class UserService:
         if password_request.new_password != password_request.confirm_password:
             raise UserException("New password and confirm password do not match", status_code=400)
 
-        # Verify old password
-        if not auth_service.verify_password(password_request.current_password, existing_user["password"]):
+        # Verify old password (bcrypt is CPU-bound, keep it off the event loop)
+        password_verified = await run_password_hash(
+            auth_service.verify_password, password_request.current_password, existing_user["password"]
+        )
+        if not password_verified:
             raise UserException("Current password is incorrect", status_code=400)
 
         # Hash new password
-        new_password_hash = auth_service.get_password_hash(password_request.new_password)
+        new_password_hash = await run_password_hash(auth_service.get_password_hash, password_request.new_password)
 
         # Update password
         update_data = {
-            "password": new_password_hash,
-            "updated_at": datetime.utcnow()
+            "password": new_password_hash
         }
 
-        result = await self.user_repository.update_user(user_id, {"$set": update_data}, acting_user_id)
+        result = await self.user_repository.update_user(object_id, {"$set": update_data}, acting_user_id)
         if not result:
             raise UserException("Failed to update password", status_code=500)
 
         return {"message": "Password changed successfully"}
 
+    def _account_setup_task(self, email: str, token: str, user_name: str) -> EmailTaskCreate:
+        """Build the account setup email with the password creation link"""
+        # Create verification URL - you can customize this based on your frontend
+        verification_url = f"{self._frontend_url}/verify-email?token={token}"
+        
+        # Plain text and HTML bodies from the precompiled templates
+        return EmailTaskCreate(
+            to_emails=[email],
+            subject=ACCOUNT_SETUP_SUBJECT,
+            body=ACCOUNT_SETUP_TEXT.render(user_name=user_name, verification_url=verification_url),
+            html_body=ACCOUNT_SETUP_HTML.render(user_name=user_name, verification_url=verification_url),
+            priority=EmailPriority.HIGH,
+            created_by="system"
+        )
+
     async def send_account_setup_email(self, email: str, token: str, user_name: str) -> bool:
         """Send account setup email with password creation link (async via background worker)"""
         try:
-            logger.info(f"Sending account setup email to: {email}")
-            
-            # Create verification URL - you can customize this based on your frontend
-            verification_url = f"{self.settings.FRONTEND_URL}/verify-email?token={token}" if hasattr(self.settings, 'FRONTEND_URL') else f"http://localhost:3000/verify-email?token={token}"
-            
-            logger.info(f"Verification URL: {verification_url}")
-            
-            subject = "Complete Your Account Setup"
-            
-            # Plain text body
-            body = f"""
-Hello {user_name},
-
-Your account has been created! Please complete your account setup by creating a password and verifying your email address.
-
-Click the link below to set up your password:
-
-{verification_url}
-
-This link will expire in 24 hours.
-
-If you did not expect this email, please ignore it.
-
-Best regards,
-CSV2JSON Team
-            """.strip()
-            
-            # HTML body
-            html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>Account Setup</title>
-</head>
-<body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-    <h2 style="color: #333;">Welcome to CSV2JSON!</h2>
-    
-    <p>Hello {user_name},</p>
-    
-    <p>Your account has been created! Please complete your account setup by creating a password and verifying your email address.</p>
-    
-    <div style="text-align: center; margin: 30px 0;">
-        <a href="{verification_url}" 
-           style="background-color: #007bff; color: white; padding: 12px 25px; 
-                  text-decoration: none; border-radius: 5px; display: inline-block;">
-            Set Up Password
-        </a>
-    </div>
-    
-    <p>Or copy and paste this link into your browser:</p>
-    <p style="word-break: break-all; color: #666;">{verification_url}</p>
-    
-    <p><strong>This link will expire in 24 hours.</strong></p>
-    
-    <p>If you did not expect this email, please ignore it.</p>
-    
-    <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
-    <p style="color: #888; font-size: 12px;">
-        Best regards,<br>
-        CSV2JSON Team
-    </p>
-</body>
-</html>
-            """.strip()
-            
-            logger.info(f"Creating email task for: {email}")
+            logger.info(f"Creating account setup email task for: {email}")
             
             # Create email task and queue it for background processing
-            from app.routers.email.email_model import EmailTaskCreate, EmailPriority
-            task_data = EmailTaskCreate(
-                to_emails=[email],
-                subject=subject,
-                body=body,
-                html_body=html_body,
-                priority=EmailPriority.HIGH,
-                created_by="system"
-            )
-            
-            task_id = await self.email_service.create_email_task(task_data)
+            task_id = await self.email_service.create_email_task(self._account_setup_task(email, token, user_name))
             logger.info(f"Email task created with ID: {task_id}")
             
             # Queue the email for background processing
-            from app.workers.background_worker import add_email_to_queue
             await add_email_to_queue(task_id)
             
             logger.info(f"Email task queued for background processing: {task_id}")
             return True  # Return immediately, don't wait for email to be sent
             
-        except Exception as e:
-            logger.error(f"Error creating email task for {email}: {str(e)}")
-            print(f"Error creating email task: {str(e)}")
+        except Exception:
+            logger.exception(f"Error creating email task for {email}")
             return False
     
+    async def send_account_setup_emails_bulk(self, recipients: List[Tuple[str, str, str]]) -> int:
+        """Queue account setup emails for many users with one insert and one queue push
+
+        Args:
+            recipients: (email, token, user_name) for each user
+
+        Returns:
+            The number of emails queued
+        """
+        if not recipients:
+            return 0
+        try:
+            tasks = [self._account_setup_task(email, token, user_name) for email, token, user_name in recipients]
+            task_ids = await self.email_service.create_email_tasks_bulk(tasks)
+            
+            await add_emails_to_queue(task_ids)
+            return len(task_ids)
+            
+        except Exception:
+            logger.exception(f"Error creating {len(recipients)} account setup email tasks")
+            return 0
+    
+    async def _raise_verification_token_error(self, token: str) -> NoReturn:
+        """Look a token up again to explain why it cannot be used"""
+        user = await self.user_repository.find_by_verification_token(token, fields=("is_verify_email",))
+        if not user:
+            raise UserException("Invalid verification token", status_code=400)
+        if user.get("is_verify_email", False):
+            raise UserException("Email is already verified", status_code=400)
+        raise UserException("Verification token has expired", status_code=400)
+
     async def verify_email_with_password(self, verify_request: VerifyEmailRequest) -> Dict[str, Any]:
         """Verify email and set password using token"""
-        from app.routers.auth.auth_service import AuthService
-        auth_service = AuthService()
+        auth_service = self.auth_service
         
         try:
             # Validate password match
             if verify_request.password != verify_request.confirm_password:
                 raise UserException("Password and confirm password do not match", status_code=400)
             
-            # Find user by verification token
-            user = await self.user_repository.find_by_verification_token(verify_request.token)
-            
-            if not user:
-                raise UserException("Invalid verification token", status_code=400)
-            
-            # Check if token is expired
-            expires_at = user.get("email_verification_expires", datetime.utcnow())
+            # Reject bad tokens with a cheap projected lookup before paying for bcrypt
             now = datetime.utcnow()
+            user = await self.user_repository.find_by_verification_token(
+                verify_request.token, valid_at=now, fields=("is_verify_email",)
+            )
+            if not user or user.get("is_verify_email", False):
+                await self._raise_verification_token_error(verify_request.token)
             
-            # Handle case where expires_at might be stored as string
-            if isinstance(expires_at, str):
-                try:
-                    # Try ISO format first
-                    expires_at = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
-                except ValueError:
-                    # Fallback to dateutil parser
-                    from dateutil import parser
-                    expires_at = parser.parse(expires_at)
-            
-            if expires_at < now:
-                raise UserException("Verification token has expired", status_code=400)
-            
-            # Check if already verified
-            is_verified = user.get("is_verify_email", False)
-            
-            if is_verified:
-                raise UserException("Email is already verified", status_code=400)
-            
-            # Hash password
-            hashed_password = auth_service.get_password_hash(verify_request.password)
+            hashed_password = await run_password_hash(auth_service.get_password_hash, verify_request.password)
             
-            # Update user with password and verify email
-            user_id = str(user["_id"])
+            # Verify email and set password in a single atomic update
             update_data = {
                 "password": hashed_password,
                 "is_verify_email": True,
                 "is_locked": False,  # Unlock user when they set password
-                "failed_login_attempts": 0,  # Reset failed attempts
-                "email_verification_token": None,
-                "email_verification_expires": None,
-                "updated_at": datetime.utcnow()
+                "failed_login_attempts": 0  # Reset failed attempts
             }
+            user = await self.user_repository.consume_verification_token(verify_request.token, now, update_data)
             
-            await self.user_repository.update_user(user_id, {"$set": update_data}, "system")
+            if not user:
+                # Another request used the token in the meantime
+                await self._raise_verification_token_error(verify_request.token)
             
             return {"message": "Email verified and password set successfully", "status": "verified"}
             
@@ -309,55 +352,41 @@ CSV2JSON Team
         except Exception as e:
             raise UserException(f"Error verifying email: {str(e)}", status_code=500)
     
-    async def resend_verification_email(self, user_id: str) -> Dict[str, Any]:
+    async def resend_verification_email(self, user_id: str, background_tasks: Optional[BackgroundTasks] = None) -> Dict[str, Any]:
         """Resend verification email to user"""
         try:
             logger.info(f"Starting resend verification email process for user_id: {user_id}")
             
-            # Get user
-            user = await self.user_repository.find_by_id(user_id)
-            if not user:
-                logger.error(f"User not found for user_id: {user_id}")
-                raise UserException("User not found", status_code=404)
-            
-            logger.info(f"Found user: {user.get('username')} with email: {user.get('email')}")
+            # Generate new verification token
+            now = datetime.utcnow()
+            verification_token = _new_token()
+            verification_expires = now + _VERIFY_TTL
             
-            # Check if already verified
-            if user.get("is_verify_email", False):
+            # Store the token only if the user exists and is still unverified
+            user = await self.user_repository.issue_verification_token(
+                user_id, hash_token(verification_token), verification_expires
+            )
+            if not user:
+                # Only on failure: find out whether the user is missing or verified
+                existing_user = await self.user_repository.find_by_id(user_id, fields=("is_verify_email",))
+                if not existing_user:
+                    logger.error(f"User not found for user_id: {user_id}")
+                    raise UserException("User not found", status_code=404)
                 logger.warning(f"Email already verified for user_id: {user_id}")
                 raise UserException("Email is already verified", status_code=400)
             
-            # Generate new verification token
-            verification_token = secrets.token_urlsafe(32)
-            verification_expires = datetime.utcnow() + timedelta(hours=24)
-            
-            logger.info(f"Generated new verification token for user_id: {user_id}")
-            
-            # Update user with new token
-            update_data = {
-                "email_verification_token": verification_token,
-                "email_verification_expires": verification_expires,
-                "updated_at": datetime.utcnow()
-            }
-            
-            await self.user_repository.update_user(user_id, {"$set": update_data}, "system")
             logger.info(f"Updated user with new verification token for user_id: {user_id}")
             
-            # Send new verification email
-            logger.info(f"Attempting to send verification email to: {user['email']}")
-            success = await self.send_account_setup_email(
-                user["email"], 
-                verification_token, 
+            # Send new verification email after the response; failures are logged there
+            _schedule(
+                background_tasks,
+                self.send_account_setup_email,
+                user["email"],
+                verification_token,
                 user.get("first_name") or user["username"]
             )
             
-            logger.info(f"Email send result: {success} for user_id: {user_id}")
-            
-            if success:
-                return {"message": "Verification email sent successfully"}
-            else:
-                logger.error(f"Failed to send verification email for user_id: {user_id}")
-                raise UserException("Failed to send verification email", status_code=500)
+            return {"message": "Verification email queued"}
                 
         except UserException:
             raise
@@ -365,36 +394,68 @@ CSV2JSON Team
             logger.error(f"Unexpected error in resend_verification_email for user_id: {user_id}: {str(e)}")
             raise UserException(f"Error resending verification email: {str(e)}", status_code=500)
     
-    async def forgot_password(self, request: ForgotPasswordRequest) -> Dict[str, Any]:
+    async def bulk_resend_verification(self, user_ids: List[str]) -> Dict[str, Any]:
+        """Resend verification emails to many users (for admin scripts)
+
+        Users that are missing or already verified are skipped. Tokens are
+        written with a single bulk_write and the emails are queued in one batch.
+        """
+        users = await self.user_repository.find_unverified_by_ids(user_ids)
+        if not users:
+            return {"sent": 0, "failed": 0, "skipped": len(user_ids)}
+        
+        verification_expires = datetime.utcnow() + _VERIFY_TTL
+        raw_tokens = [_new_token() for _ in users]
+        await self.user_repository.bulk_set_verification_tokens([
+            (user["_id"], hash_token(token), verification_expires)
+            for user, token in zip(users, raw_tokens)
+        ])
+        
+        sent = await self.send_account_setup_emails_bulk([
+            (user["email"], token, user.get("first_name") or user["username"])
+            for user, token in zip(users, raw_tokens)
+        ])
+        logger.info(f"Bulk resend verification: {sent}/{len(users)} emails queued")
+        
+        return {"sent": sent, "failed": len(users) - sent, "skipped": len(user_ids) - len(users)}
+    
+    async def forgot_password(self, request: ForgotPasswordRequest, background_tasks: Optional[BackgroundTasks] = None) -> Dict[str, Any]:
         """Send password reset email"""
+        started = time.perf_counter()
         try:
             # Find user by email
-            user = await self.user_repository.find_by_email(request.email)
+            user = await self.user_repository.find_by_email(request.email, fields=("email", "username", "first_name"))
             
             if not user:
-                # Don't reveal if email exists or not for security
+                # Don't reveal if email exists or not for security, including
+                # through a faster response
+                remaining = _forgot_password_seconds - (time.perf_counter() - started)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
                 return {"message": "If the email exists in our system, a password reset link has been sent."}
             
             # Generate reset token
-            reset_token = secrets.token_urlsafe(32)
-            reset_expires = datetime.utcnow() + timedelta(hours=1)  # 1 hour expiry for password reset
+            now = datetime.utcnow()
+            reset_token = _new_token()
+            reset_expires = now + _RESET_TTL
             
             # Update user with reset token
-            user_id = str(user["_id"])
             update_data = {
-                "password_reset_token": reset_token,
-                "password_reset_expires": reset_expires,
-                "updated_at": datetime.utcnow()
+                "password_reset_token": hash_token(reset_token),
+                "password_reset_expires": reset_expires
             }
             
-            await self.user_repository.update_user(user_id, {"$set": update_data}, "system")
+            await self.user_repository.update_user(user["_id"], {"$set": update_data}, "system")
             
-            # Send reset email
-            success = await self.send_password_reset_email(
-                user["email"], 
-                reset_token, 
+            # Send reset email after the response
+            _schedule(
+                background_tasks,
+                self.send_password_reset_email,
+                user["email"],
+                reset_token,
                 user.get("first_name") or user["username"]
             )
+            _record_forgot_password_time(time.perf_counter() - started)
             
             return {"message": "If the email exists in our system, a password reset link has been sent."}
             
@@ -403,51 +464,38 @@ CSV2JSON Team
     
     async def reset_password(self, request: ResetPasswordRequest) -> Dict[str, Any]:
         """Reset password using token"""
-        from app.routers.auth.auth_service import AuthService
-        auth_service = AuthService()
+        auth_service = self.auth_service
         
         try:
             # Validate password match
             if request.password != request.confirm_password:
                 raise UserException("Password and confirm password do not match", status_code=400)
             
-            # Find user by reset token
-            user = await self.user_repository.find_by_reset_token(request.token)
+            # Find user by a reset token that has not expired yet
+            now = datetime.utcnow()
+            user = await self.user_repository.find_by_reset_token(request.token, valid_at=now)
             
             if not user:
+                # Only on failure: tell an expired token apart from an unknown one
+                if await self.user_repository.find_by_reset_token(request.token, fields=()):
+                    raise UserException("Reset token has expired", status_code=400)
                 raise UserException("Invalid or expired reset token", status_code=400)
             
-            # Check if token is expired
-            expires_at = user.get("password_reset_expires", datetime.utcnow())
-            now = datetime.utcnow()
-            
-            # Handle case where expires_at might be stored as string
-            if isinstance(expires_at, str):
-                try:
-                    # Try ISO format first
-                    expires_at = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
-                except ValueError:
-                    # Fallback to dateutil parser
-                    from dateutil import parser
-                    expires_at = parser.parse(expires_at)
-            
-            if expires_at < now:
-                raise UserException("Reset token has expired", status_code=400)
-            
             # Hash new password
-            hashed_password = auth_service.get_password_hash(request.password)
+            hashed_password = await run_password_hash(auth_service.get_password_hash, request.password)
             
-            # Update user with new password and clear reset token
-            user_id = str(user["_id"])
+            # Update user with new password and remove the reset token so it
+            # drops out of the sparse token index
             update_data = {
                 "is_locked": False,
-                "password": hashed_password,
-                "password_reset_token": None,
-                "password_reset_expires": None,
-                "updated_at": datetime.utcnow()
+                "password": hashed_password
             }
             
-            await self.user_repository.update_user(user_id, {"$set": update_data}, "system")
+            await self.user_repository.find_one_and_update(
+                user["_id"],
+                {"$set": update_data, "$unset": {"password_reset_token": "", "password_reset_expires": ""}},
+                "system"
+            )
             
             return {"message": "Password reset successfully"}
             
@@ -460,67 +508,15 @@ CSV2JSON Team
         """Send password reset email (async via background worker)"""
         try:
             # Create reset URL
-            reset_url = f"{self.settings.FRONTEND_URL}/reset-password?token={token}" if hasattr(self.settings, 'FRONTEND_URL') else f"http://localhost:3000/reset-password?token={token}"
+            reset_url = f"{self._frontend_url}/reset-password?token={token}"
             
-            subject = "Password Reset Request"
+            subject = PASSWORD_RESET_SUBJECT
             
-            # Plain text body
-            body = f"""
-Hello {user_name},
-
-You have requested to reset your password. Click the link below to create a new password:
-
-{reset_url}
-
-This link will expire in 1 hour.
-
-If you did not request this password reset, please ignore this email.
-
-Best regards,
-CSV2JSON Team
-            """.strip()
-            
-            # HTML body
-            html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>Password Reset</title>
-</head>
-<body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-    <h2 style="color: #333;">Password Reset Request</h2>
-    
-    <p>Hello {user_name},</p>
-    
-    <p>You have requested to reset your password. Click the button below to create a new password:</p>
-    
-    <div style="text-align: center; margin: 30px 0;">
-        <a href="{reset_url}" 
-           style="background-color: #dc3545; color: white; padding: 12px 25px; 
-                  text-decoration: none; border-radius: 5px; display: inline-block;">
-            Reset Password
-        </a>
-    </div>
-    
-    <p>Or copy and paste this link into your browser:</p>
-    <p style="word-break: break-all; color: #666;">{reset_url}</p>
-    
-    <p><strong>This link will expire in 1 hour.</strong></p>
-    
-    <p>If you did not request this password reset, please ignore this email.</p>
-    
-    <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
-    <p style="color: #888; font-size: 12px;">
-        Best regards,<br>
-        CSV2JSON Team
-    </p>
-</body>
-</html>
-            """.strip()
+            # Plain text and HTML bodies from the precompiled templates
+            body = PASSWORD_RESET_TEXT.render(user_name=user_name, reset_url=reset_url)
+            html_body = PASSWORD_RESET_HTML.render(user_name=user_name, reset_url=reset_url)
             
             # Create email task and queue it for background processing
-            from app.routers.email.email_model import EmailTaskCreate, EmailPriority
             task_data = EmailTaskCreate(
                 to_emails=[email],
                 subject=subject,
@@ -534,13 +530,16 @@ CSV2JSON Team
             logger.info(f"Password reset email task created with ID: {task_id}")
             
             # Queue the email for background processing
-            from app.workers.background_worker import add_email_to_queue
             await add_email_to_queue(task_id)
             
             logger.info(f"Password reset email task queued for background processing: {task_id}")
             return True  # Return immediately, don't wait for email to be sent
             
-        except Exception as e:
-            logger.error(f"Error creating password reset email task for {email}: {str(e)}")
-            print(f"Error creating password reset email task: {str(e)}")
+        except Exception:
+            logger.exception(f"Error creating password reset email task for {email}")
             return False
+
+@lru_cache()
+def get_user_service() -> UserService:
+    """Process-wide UserService shared by the routers"""
+    return UserService()
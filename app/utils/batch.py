@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Set, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+class BatchLoader(Generic[K, V]):
+    """
+    Coalesces loads requested during the same event-loop iteration into one
+    call of batch_fn, which gets the distinct keys and returns a dict of the
+    values it found. Keys it leaves out resolve to None.
+
+    Intended for use from a single event loop, so no locking is performed.
+    """
+    def __init__(self, batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]], max_batch_size: int = 100) -> None:
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self._queue: List[Tuple[K, "asyncio.Future[Optional[V]]"]] = []
+        # The loop only holds weak references to tasks, so keep running
+        # batches here until they finish or their waiters would hang
+        self._running: Set["asyncio.Task[Any]"] = set()
+
+    async def load(self, key: K) -> Optional[V]:
+        """Queue a key for the next batch and wait for its value"""
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Optional[V]]" = loop.create_future()
+        self._queue.append((key, future))
+        if len(self._queue) == 1:
+            # Dispatch once everything already scheduled on the loop has queued its key
+            loop.call_soon(self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        queue, self._queue = self._queue, []
+        for start in range(0, len(queue), self.max_batch_size):
+            task = asyncio.create_task(self._run(queue[start:start + self.max_batch_size]))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[K, "asyncio.Future[Optional[V]]"]]) -> None:
+        try:
+            values = await self.batch_fn(list(dict.fromkeys(key for key, _ in batch)))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch:
+            if not future.done():
+                future.set_result(values.get(key))
@@ -0,0 +1,19 @@
+import re
+from typing import Any
+from bson import ObjectId # type: ignore
+
+_OBJECT_ID_MATCH = re.compile(r"[0-9a-fA-F]{24}").fullmatch
+
+# For Path(..., regex=OBJECT_ID_REGEX): malformed ids get a 422 before the route runs
+OBJECT_ID_REGEX = r"^[0-9a-fA-F]{24}$"
+
+def is_valid_object_id(value: Any) -> bool:
+    """
+    Cheap check for an ObjectId or a 24-character hex id
+
+    Same answer as ObjectId.is_valid for strings, without building an
+    ObjectId and catching the error on failure.
+    """
+    if isinstance(value, ObjectId):
+        return True
+    return isinstance(value, str) and _OBJECT_ID_MATCH(value) is not None
@@ -3,22 +3,24 @@ from bson import ObjectId # type: ignore
 import json
 from datetime import datetime
 
+def _serialize_document(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a serializable copy of a MongoDB document in a single pass
+    """
+    serialized = {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in data.items()
+    }
+    # Convert ObjectId to string
+    if "_id" in serialized:
+        serialized["_id"] = str(serialized["_id"])
+    return serialized
+
 def list_serial(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Convert list of MongoDB documents to serializable format
     """
-    serialized_list = []
-    for item in data:
-        serialized_item = item.copy()
-        # Convert ObjectId to string
-        if "_id" in serialized_item:
-            serialized_item["_id"] = str(serialized_item["_id"])
-        # Convert datetime to string
-        for key, value in serialized_item.items():
-            if isinstance(value, datetime):
-                serialized_item[key] = value.isoformat()
-        serialized_list.append(serialized_item)
-    return serialized_list
+    return [_serialize_document(item) for item in data]
 
 def individual_serial(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
@@ -26,16 +28,7 @@ def individual_serial(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
     if not data:
         return None
-    
-    serialized_data = data.copy()
-    # Convert ObjectId to string
-    if "_id" in serialized_data:
-        serialized_data["_id"] = str(serialized_data["_id"])
-    # Convert datetime to string
-    for key, value in serialized_data.items():
-        if isinstance(value, datetime):
-            serialized_data[key] = value.isoformat()
-    return serialized_data
+    return _serialize_document(data)
 
 class JSONEncoder(json.JSONEncoder):
     """
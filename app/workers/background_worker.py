@@ -2,11 +2,11 @@ import asyncio
 import os
 import re
 from datetime import datetime
-from typing import Dict, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any, Set
 from app.routers.task.task_repository import TaskRepository
 from app.routers.file.file_repository import FileRepository
 from app.database import get_collection
-from app.dependencies.file import read_csv_file
+from app.dependencies.file import read_csv_in_batches
 import logging
 
 # Configure logging with explicit handler setup
@@ -97,6 +97,60 @@ async def get_current_processing_email() -> Optional[Dict[str, Any]]:
         "status": "processing"
     }
 
+# Inserts allowed in flight while the next CSV batch is being parsed
+MAX_PENDING_INSERTS = 4
+
+async def insert_csv_batches(csv_collection: Any, batches: Iterator[List[Dict[str, Any]]], task_id: str) -> int:
+    """
+    Insert CSV record batches for a task, parsing the next batch in a thread
+    while earlier batches are still being inserted
+
+    Returns:
+        Number of rows inserted
+    """
+    now = datetime.now()
+    total_rows = 0
+    batch_number = 0
+    pending: Set["asyncio.Task[int]"] = set()
+    
+    async def insert(records: List[Dict[str, Any]]) -> int:
+        # Rows are independent, so the server need not apply them in order
+        await csv_collection.insert_many(records, ordered=False)
+        return len(records)
+    
+    try:
+        while True:
+            records = await asyncio.to_thread(next, batches, None)
+            if records is None:
+                break
+            if not records:
+                continue
+            
+            # Add metadata to each record
+            for record in records:
+                record["task_id"] = task_id
+                record["processed_at"] = now
+                record["created_by"] = "worker"
+                record["created_at"] = now
+                record["updated_by"] = "worker"
+                record["updated_at"] = now
+            
+            if len(pending) >= MAX_PENDING_INSERTS:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                total_rows += sum(task.result() for task in done)
+            pending.add(asyncio.create_task(insert(records)))
+            batch_number += 1
+            logger.info(f"Queued batch {batch_number} ({total_rows} rows inserted so far)")
+        
+        for task in asyncio.as_completed(pending):
+            total_rows += await task
+        pending = set()
+        return total_rows
+    finally:
+        # On failure, stop the inserts that are still running
+        for task in pending:
+            task.cancel()
+
 async def process_csv_task(task_id: str, file_id: str) -> None:
     """
     Process a CSV file and insert data into MongoDB
@@ -126,38 +180,14 @@ async def process_csv_task(task_id: str, file_id: str) -> None:
         if not os.path.exists(file_path):
             raise Exception(f"File not found on disk: {file_path}")
         
-        # Read CSV file
-        df = read_csv_file(file_path)
-        
         # Get collection
         csv_collection = await get_collection("csv")
 
-        # Extract column names
-        column_names = df.columns.tolist()
-
-        # Convert DataFrame to list of dictionaries for MongoDB insertion
-        records = df.to_dict("records")
-        
-        # Add metadata to each record
-        now = datetime.now()
-        for record in records:
-            record["task_id"] = task_id
-            record["processed_at"] = now
-            record["created_by"] = "worker"
-            record["created_at"] = now
-            record["updated_by"] = "worker"
-            record["updated_at"] = now
-        
-        # Insert records in batches to avoid overwhelming MongoDB
-        if records:
-            BATCH_SIZE = 1000  # ปรับขนาด batch ตามที่ต้องการ
-            total_records = len(records)
-            for i in range(0, total_records, BATCH_SIZE):
-                batch = records[i:i + BATCH_SIZE]
-                await csv_collection.insert_many(batch)
-                logger.info(f"Inserted batch {i//BATCH_SIZE + 1}/{(total_records + BATCH_SIZE - 1)//BATCH_SIZE}")
-                # อาจเพิ่ม delay ระหว่าง batches ถ้าต้องการให้ช้าลง
-                # await asyncio.sleep(0.1)
+        # Read the CSV a batch at a time and insert each batch as it is parsed,
+        # so the whole file is never held in memory as records
+        BATCH_SIZE = 5000  # ปรับขนาด batch ตามที่ต้องการ (driver splits at 16MB / 100k ops)
+        column_names, batches = read_csv_in_batches(file_path, BATCH_SIZE)
+        total_rows = await insert_csv_batches(csv_collection, batches, task_id)
         
         # Calculate processing time
         end_time = datetime.now()
@@ -170,14 +200,14 @@ async def process_csv_task(task_id: str, file_id: str) -> None:
             column_names=column_names,
             error_message=None,
             processing_time=execution_time,
-            total_rows=len(records)
+            total_rows=total_rows
         )
         
         # Delete file from disk
         os.remove(file_path)
         end_time = datetime.now()
         execution_time = (end_time - start_time).total_seconds()
-        logger.info(f"Successfully processed task {task_id} with {len(records)} records in {execution_time:.2f} seconds")
+        logger.info(f"Successfully processed task {task_id} with {total_rows} records in {execution_time:.2f} seconds")
         
     except Exception as e:
         error_message = str(e)
@@ -189,6 +219,16 @@ async def process_csv_task(task_id: str, file_id: str) -> None:
         end_time = datetime.now()
         execution_time = (end_time - start_time).total_seconds()
         
+        # Batches are inserted while the file is still being parsed, so drop
+        # whatever this task inserted before the failure
+        try:
+            csv_collection = await get_collection("csv")
+            result = await csv_collection.delete_many({"task_id": task_id})
+            if result.deleted_count:
+                logger.info(f"Removed {result.deleted_count} partially inserted rows for task {task_id}")
+        except Exception as cleanup_error:
+            logger.error(f"Error removing partial rows for task {task_id}: {cleanup_error}")
+        
         # Update task with error and processing time
         await task_repo.update_task_status(
             task_id=task_id,
@@ -518,10 +558,10 @@ async def process_email_task(email_id: str) -> None:
     logger.info(f"📧 [EMAIL-{email_id}] Starting email processing")
     
     try:
-        # Import email service
-        from app.routers.email.email_service import EmailService
+        # Shared email service keeps its SMTP connection between emails
+        from app.routers.email.email_service import get_email_service
         
-        email_service = EmailService()
+        email_service = get_email_service()
         
         # Get email task
         logger.debug(f"📧 [EMAIL-{email_id}] Fetching email task from database")
@@ -560,8 +600,8 @@ async def process_email_task(email_id: str) -> None:
         
         # Handle error in email service
         try:
-            from app.routers.email.email_service import EmailService
-            email_service = EmailService()
+            from app.routers.email.email_service import get_email_service
+            email_service = get_email_service()
             await email_service._handle_email_failure(email_id, error_message)
         except Exception as handle_error:
             logger.error(f"📧 [EMAIL-{email_id}] Error handling email failure: {handle_error}")
@@ -705,6 +745,18 @@ async def add_email_to_queue(email_id: str) -> None:
     await email_queue.put({"email_id": email_id})
     logger.info(f"📧 ➕ Added email {email_id} to processing queue (queue size: ~{email_queue.qsize()})")
 
+async def add_emails_to_queue(email_ids: List[str]) -> None:
+    """
+    Add many email tasks to the processing queue at once
+    
+    Args:
+        email_ids: IDs of the email tasks
+    """
+    # The queue is unbounded, so put_nowait never blocks
+    for email_id in email_ids:
+        email_queue.put_nowait({"email_id": email_id})
+    logger.info(f"📧 ➕ Added {len(email_ids)} emails to processing queue (queue size: ~{email_queue.qsize()})")
+
 async def start_worker() -> None:
     """
     Start the background worker if it's not already running
@@ -738,15 +790,14 @@ async def load_pending_tasks() -> None:
     task_repo = TaskRepository()
     
     try:
-        # Get tasks that aren't completed
-        pending_tasks = await task_repo.get_pending_tasks()
-        
-        if pending_tasks:
-            logger.info(f"Found {len(pending_tasks)} pending tasks")
-            
-            # Add tasks to queue
-            for task in pending_tasks:
-                await add_task_to_queue(task["_id"], task["file_id"])
+        # Stream tasks that aren't completed straight into the queue
+        count = 0
+        async for task in task_repo.iter_pending_tasks():
+            await add_task_to_queue(task["_id"], task["file_id"])
+            count += 1
+        
+        if count:
+            logger.info(f"Found {count} pending tasks")
         else:
             logger.info("No pending tasks found")
             
@@ -764,24 +815,21 @@ async def load_pending_searches() -> None:
     search_repo = SearchRepository()
     
     try:
-        # Get searches that aren't completed
-        pending_searches = await search_repo.get_pending_searches()
-        
-        if pending_searches:
-            logger.info(f"Found {len(pending_searches)} pending searches")
-            
-            # Add searches to queue
-            for search in pending_searches:
-                search_params = {
-                    "task_id": search["task_id"],
-                    "user_id": search["created_by"],
-                    "column_names": search.get("column_names", []),
-                    "column_options": search.get("column_options", {}),
-                    "query_list": search.get("query_list", [])
-                }
-                
-                
-                await add_search_to_queue(search["_id"], search_params)
+        # Stream searches that aren't completed straight into the queue
+        count = 0
+        async for search in search_repo.iter_pending_searches():
+            search_params = {
+                "task_id": search["task_id"],
+                "user_id": search["created_by"],
+                "column_names": search.get("column_names", []),
+                "column_options": search.get("column_options", {}),
+                "query_list": search.get("query_list", [])
+            }
+            await add_search_to_queue(search["_id"], search_params)
+            count += 1
+        
+        if count:
+            logger.info(f"Found {count} pending searches")
         else:
             logger.info("No pending searches found")
             
@@ -795,9 +843,9 @@ async def load_pending_emails() -> None:
     logger.info("📧 Loading pending emails from database")
     
     try:
-        from app.routers.email.email_service import EmailService
+        from app.routers.email.email_service import get_email_service
         
-        email_service = EmailService()
+        email_service = get_email_service()
         
         # Get pending email tasks
         pending_emails = await email_service.get_pending_tasks()
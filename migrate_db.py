@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+One-off data migrations - each runs once and is recorded in the migrations collection
+
+Run after deploying a release that adds a migration: python migrate_db.py
+"""
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, List, Tuple
+from app.database import get_collection
+
+async def convert_token_expiry_strings() -> int:
+    """Store token expiry dates that were saved as strings as real dates"""
+    users_collection = await get_collection("users")
+    modified = 0
+    for field in ("email_verification_expires", "password_reset_expires"):
+        # Unparseable strings are left as they are instead of aborting the update;
+        # they never compare as unexpired, so those tokens simply stop working
+        result = await users_collection.update_many(
+            {field: {"$type": "string"}},
+            [{"$set": {field: {"$convert": {"input": f"${field}", "to": "date", "onError": f"${field}"}}}}]
+        )
+        modified += result.modified_count
+        remaining = await users_collection.count_documents({field: {"$type": "string"}})
+        if remaining:
+            print(f"⚠️ {remaining} {field} values could not be parsed and were left as strings")
+    return modified
+
+async def unset_null_tokens() -> int:
+    """Remove tokens stored as null so those users leave the sparse token indexes"""
+    users_collection = await get_collection("users")
+    modified = 0
+    for token_field, expires_field in (
+        ("email_verification_token", "email_verification_expires"),
+        ("password_reset_token", "password_reset_expires"),
+    ):
+        result = await users_collection.update_many(
+            {token_field: {"$type": "null"}},
+            {"$unset": {token_field: "", expires_field: ""}}
+        )
+        modified += result.modified_count
+    return modified
+
+async def backfill_received_count() -> int:
+    """Give upload sessions created before received_count existed their chunk count"""
+    uploads_collection = await get_collection("chunked_uploads")
+    result = await uploads_collection.update_many(
+        {"received_count": {"$exists": False}},
+        [{"$set": {"received_count": {"$size": {"$ifNull": ["$received_chunks", []]}}}}]
+    )
+    return result.modified_count
+
+# (name, migration) in the order they must run; never rename an applied one
+MIGRATIONS: List[Tuple[str, Callable[[], Awaitable[int]]]] = [
+    ("convert_token_expiry_strings", convert_token_expiry_strings),
+    ("unset_null_tokens", unset_null_tokens),
+    ("backfill_received_count", backfill_received_count),
+]
+
+async def migrate_db() -> None:
+    print("🔧 Running migrations...")
+    migrations_collection = await get_collection("migrations")
+    
+    for name, migration in MIGRATIONS:
+        if await migrations_collection.find_one({"_id": name}):
+            print(f"⏭️ {name}: already applied")
+            continue
+        
+        # A failing migration raises before it is recorded, so it runs again next time
+        modified = await migration()
+        await migrations_collection.insert_one({
+            "_id": name,
+            "applied_at": datetime.utcnow(),
+            "modified_count": modified
+        })
+        print(f"✅ {name}: {modified} documents updated")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_db())
@@ -4,6 +4,9 @@ from datetime import datetime, timedelta
 import asyncio
 import sys
 import os
+from unittest.mock import AsyncMock, patch
+import bcrypt
+from jose import JWTError
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -29,6 +32,43 @@ async def test_password_hashing(auth_service):
     # Verify incorrect password fails
     assert auth_service.verify_password("wrongpassword", hashed) is False
 
+@pytest.mark.asyncio
+async def test_verify_password_cache(auth_service):
+    """Test that a repeated successful check skips bcrypt and failures are not cached."""
+    hashed = auth_service.get_password_hash("securepassword123")
+    assert auth_service.verify_password("securepassword123", hashed) is True
+
+    with patch("app.routers.auth.auth_service.bcrypt.checkpw", return_value=False) as verify:
+        assert auth_service.verify_password("securepassword123", hashed) is True
+        assert auth_service.verify_password("wrongpassword", hashed) is False
+        assert auth_service.verify_password("wrongpassword", hashed) is False
+    assert verify.call_count == 2
+
+@pytest.mark.asyncio
+async def test_calibrate_password_hashing(auth_service):
+    """Test that calibration picks bcrypt rounds within bounds and old hashes still verify."""
+    hashed = auth_service.get_password_hash("securepassword123")
+
+    rounds = auth_service.calibrate_password_hashing(target_ms=1, min_rounds=4, max_rounds=6)
+
+    assert 4 <= rounds <= 6
+    assert auth_service.get_password_hash("x").startswith(f"$2b${rounds:02d}$")
+    assert auth_service.verify_password("securepassword123", hashed) is True
+
+@pytest.mark.asyncio
+async def test_upgrade_password_hash(auth_service):
+    """Test that a hash made with an outdated cost is replaced and a current one is kept."""
+    auth_service.bcrypt_rounds = 5
+    old_hash = bcrypt.hashpw(b"securepassword123", bcrypt.gensalt(rounds=4)).decode()
+
+    with patch.object(auth_service.user_repository, "update_user", new_callable=AsyncMock) as update_user:
+        assert await auth_service.upgrade_password_hash("user-1", "securepassword123", old_hash) is True
+        new_hash = update_user.call_args.args[1]["$set"]["password"]
+        assert await auth_service.upgrade_password_hash("user-1", "securepassword123", new_hash) is False
+
+    assert new_hash.startswith("$2b$05$")
+    assert update_user.call_count == 1
+
 @pytest.mark.asyncio
 async def test_user_registration(auth_service):
     """Test user registration process."""
@@ -178,3 +218,36 @@ async def test_unlock_user(auth_service, test_user, login_repository):
         "127.0.0.1"
     )
     assert token is not None
+
+@pytest.mark.asyncio
+async def test_verify_token_cache(auth_service):
+    """Test that a repeated token skips jwt.decode and an expired entry is not served."""
+    token = auth_service.create_access_token({"sub": "alice", "user_id": "user-1", "roles": ["user"]})
+    first = await auth_service.verify_token(token)
+
+    with patch("app.routers.auth.auth_service.jwt.decode") as decode:
+        assert await auth_service.verify_token(token) == first
+    decode.assert_not_called()
+
+    expires_at, token_data = auth_service._token_cache.get(token)
+    with patch("app.routers.auth.auth_service.time.time", return_value=expires_at + 1), \
+         patch("app.routers.auth.auth_service.jwt.decode", side_effect=JWTError("expired")):
+        assert await auth_service.verify_token(token) is None
+    assert auth_service._token_cache.get(token) is None
+
+@pytest.mark.asyncio
+async def test_authenticate_survives_failed_hash_upgrade(auth_service):
+    """Test that an error while upgrading the password hash does not fail the login."""
+    user = {
+        "_id": "64b7f0c2a1b2c3d4e5f60718", "username": "alice", "is_verify_email": True,
+        "password": auth_service.get_password_hash("securepassword123")
+    }
+    with patch.object(auth_service.user_repository, "find_by_username", new_callable=AsyncMock, return_value=user), \
+         patch.object(auth_service, "record_login_attempt", new_callable=AsyncMock), \
+         patch.object(auth_service, "reset_failed_attempts", new_callable=AsyncMock), \
+         patch.object(auth_service, "update_user_last_login", new_callable=AsyncMock) as update_last_login, \
+         patch.object(auth_service, "upgrade_password_hash", new_callable=AsyncMock, side_effect=RuntimeError("db down")):
+        result = await auth_service.authenticate_user("alice", "securepassword123", "127.0.0.1")
+
+    assert result is user
+    update_last_login.assert_awaited_once()
@@ -138,3 +138,50 @@ async def test_load_pending_tasks(mock_db):
             # Check that pending tasks were loaded and processed
             assert mock_get_tasks.called
             assert mock_process.call_count == 2
+
+@pytest.mark.asyncio
+async def test_insert_csv_batches_overlaps_inserts():
+    """Test that every batch is inserted with task metadata and the row count is summed."""
+    import asyncio
+    from app.workers.background_worker import insert_csv_batches
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def insert_many(records, ordered=True):
+        assert ordered is False
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    collection = AsyncMock()
+    collection.insert_many.side_effect = insert_many
+    batches = iter([[{"name": "a"}, {"name": "b"}], [], [{"name": "c"}], [{"name": "d"}]])
+
+    total_rows = await insert_csv_batches(collection, batches, "task-1")
+
+    assert total_rows == 4
+    assert collection.insert_many.await_count == 3
+    assert all(record["task_id"] == "task-1" for call in collection.insert_many.call_args_list for record in call.args[0])
+    assert max_in_flight > 1
+
+@pytest.mark.asyncio
+async def test_process_csv_task_removes_partial_rows_on_failure(tmp_path):
+    """Test that rows inserted before a parse failure are removed and the task is marked failed."""
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text("name,age\nalice,30\n")
+    collection = AsyncMock()
+    collection.delete_many.return_value.deleted_count = 5000
+
+    with patch('app.workers.background_worker.get_collection', new_callable=AsyncMock, return_value=collection), \
+         patch('app.workers.background_worker.FileRepository.get_file_by_id', new_callable=AsyncMock,
+               return_value={"file_path": str(csv_path)}), \
+         patch('app.workers.background_worker.insert_csv_batches', new_callable=AsyncMock,
+               side_effect=ValueError("Error tokenizing data")), \
+         patch('app.workers.background_worker.TaskRepository.update_task_status', new_callable=AsyncMock) as update_task:
+        await process_file_task("task-1", "file-1")
+
+    collection.delete_many.assert_awaited_once_with({"task_id": "task-1"})
+    assert update_task.call_args.kwargs["error_message"] == "Error tokenizing data"
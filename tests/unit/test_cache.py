@@ -0,0 +1,49 @@
+import pytest
+from unittest.mock import patch
+
+from app.utils.cache import TTLCache
+
+pytestmark = [pytest.mark.unit]
+
+def test_cache_set_and_get():
+    """Test that stored values are returned until invalidated."""
+    cache = TTLCache(maxsize=10, ttl=30)
+    cache.set("user-1", {"username": "alice"})
+
+    assert cache.get("user-1") == {"username": "alice"}
+    assert cache.get("missing") is None
+
+    cache.pop("user-1")
+    assert cache.get("user-1") is None
+
+def test_cache_entries_expire():
+    """Test that entries are dropped once their TTL has passed."""
+    cache = TTLCache(maxsize=10, ttl=30)
+
+    with patch("app.utils.cache.time.monotonic", return_value=100.0):
+        cache.set("user-1", {"username": "alice"})
+
+    with patch("app.utils.cache.time.monotonic", return_value=129.0):
+        assert cache.get("user-1") == {"username": "alice"}
+
+    with patch("app.utils.cache.time.monotonic", return_value=131.0):
+        assert cache.get("user-1") is None
+    assert len(cache) == 0
+
+def test_cache_evicts_oldest_when_full():
+    """Test that the oldest entry is evicted when maxsize is exceeded."""
+    cache = TTLCache(maxsize=2, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
+
+def test_cache_disabled_with_zero_ttl():
+    """Test that a TTL of zero disables caching."""
+    cache = TTLCache(maxsize=2, ttl=0)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
@@ -5,7 +5,7 @@ import tempfile
 import csv
 from unittest.mock import patch, AsyncMock
 
-from app.dependencies.file import read_csv_file, read_and_save_csv_to_mongodb
+from app.dependencies.file import read_csv_file, read_csv_in_batches, read_and_save_csv_to_mongodb
 
 # Sample CSV data for testing
 SAMPLE_CSV_DATA = """Entity_logical_id,Subject_type,Naal_wholename,Naal_gender,Citi_country
@@ -62,6 +62,17 @@ def test_read_csv_file_semicolon(temp_csv_file_semicolon):
     assert df['Naal_wholename'].tolist() == ['John Smith', 'Jane Doe', 'Ahmed Ali']
     assert df['Citi_country'].tolist() == ['USA', 'GBR', 'EGY']
 
+def test_read_csv_in_batches(temp_csv_file_semicolon):
+    """Test that a CSV file is read as record batches with the detected delimiter."""
+    columns, batches = read_csv_in_batches(temp_csv_file_semicolon, batch_size=2)
+    batches = list(batches)
+
+    assert columns == ['Entity_logical_id', 'Subject_type', 'Naal_wholename', 'Naal_gender', 'Citi_country']
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[1][0]['Naal_wholename'] == 'Ahmed Ali'
+    # Types do not depend on the batch boundaries
+    assert all(isinstance(record['Entity_logical_id'], str) for batch in batches for record in batch)
+
 def test_read_csv_file_nonexistent():
     """Test reading a nonexistent CSV file."""
     with pytest.raises(Exception):
@@ -74,7 +85,7 @@ async def test_read_and_save_csv_to_mongodb(temp_csv_file):
     with patch('app.dependencies.file.get_collection', new_callable=AsyncMock) as mock_get_collection:
         # Mock collection operations
         mock_collection = AsyncMock()
-        mock_collection.delete_many = AsyncMock(return_value=None)
+        mock_collection.drop = AsyncMock(return_value=None)
         # Create a mock response with inserted_ids attribute
         mock_insert_result = AsyncMock()
         mock_insert_result.inserted_ids = [f"id_{i}" for i in range(3)]
@@ -91,7 +102,7 @@ async def test_read_and_save_csv_to_mongodb(temp_csv_file):
         
         # Verify that MongoDB operations were called
         mock_get_collection.assert_called_once()
-        mock_collection.delete_many.assert_called_once()
+        mock_collection.drop.assert_called_once()
         mock_collection.insert_many.assert_called_once()
         
         # Check the inserted data format
@@ -0,0 +1,39 @@
+import pytest
+import smtplib
+from email.mime.multipart import MIMEMultipart
+from unittest.mock import MagicMock, patch
+
+from app.routers.email.email_service import EmailService
+from app.routers.email.email_templates import ACCOUNT_SETUP_HTML, ACCOUNT_SETUP_TEXT
+
+pytestmark = [pytest.mark.unit]
+
+def test_deliver_reuses_smtp_connection():
+    """Test that consecutive sends share one SMTP login."""
+    service = EmailService()
+    with patch("app.routers.email.email_service.smtplib.SMTP") as smtp_class:
+        service._deliver(MIMEMultipart(), ["a@example.com"])
+        service._deliver(MIMEMultipart(), ["b@example.com"])
+
+    smtp_class.assert_called_once()
+    assert smtp_class.return_value.send_message.call_count == 2
+
+def test_deliver_reconnects_when_server_disconnected():
+    """Test that a connection dropped by the server is reopened once."""
+    service = EmailService()
+    stale = MagicMock()
+    stale.send_message.side_effect = smtplib.SMTPServerDisconnected()
+    service._smtp = stale
+
+    with patch("app.routers.email.email_service.smtplib.SMTP") as smtp_class:
+        service._deliver(MIMEMultipart(), ["a@example.com"])
+
+    smtp_class.assert_called_once()
+    assert service._smtp is smtp_class.return_value
+
+def test_html_templates_escape_user_name():
+    """Test that user names are HTML-escaped in the HTML body only."""
+    values = {"user_name": "<script>x</script>", "verification_url": "https://example.com/verify?token=t"}
+
+    assert "&lt;script&gt;" in ACCOUNT_SETUP_HTML.render(**values)
+    assert "<script>x</script>" in ACCOUNT_SETUP_TEXT.render(**values)
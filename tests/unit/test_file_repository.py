@@ -0,0 +1,26 @@
+import pytest
+from unittest.mock import patch
+
+from app.routers.file.file_repository import FileRepository
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+@pytest.mark.asyncio
+async def test_add_received_chunk_counts_each_chunk_once(mock_db):
+    """Test that chunks are counted once and the count is returned without the array."""
+    async def mock_get_collection(collection_name: str):
+        return mock_db[collection_name]
+
+    result = await mock_db.chunked_uploads.insert_one({"received_chunks": [], "received_count": 0, "total_chunks": 3})
+    upload_id = str(result.inserted_id)
+
+    with patch("app.routers.file.file_repository.get_collection", side_effect=mock_get_collection):
+        repository = FileRepository()
+        assert await repository.add_received_chunk(upload_id, 0) == 1
+        assert await repository.add_received_chunk(upload_id, 2) == 2
+        assert await repository.add_received_chunk(upload_id, 2) is None
+
+        upload = await repository.get_chunked_upload(upload_id, include_chunks=False)
+
+    assert upload["received_count"] == 2
+    assert "received_chunks" not in upload
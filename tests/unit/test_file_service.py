@@ -0,0 +1,30 @@
+import io
+import os
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import UploadFile
+
+from app.exceptions import FileException
+from app.routers.file.file_model import UploadStatus
+from app.routers.file.file_service import FileService
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+@pytest.mark.asyncio
+async def test_upload_chunk_duplicate_keeps_accepted_chunk(tmp_path, monkeypatch):
+    """Test that a rejected duplicate chunk leaves the accepted chunk's bytes alone."""
+    monkeypatch.chdir(tmp_path)
+    upload_id = "64b7f0c2a1b2c3d4e5f60718"
+    chunks_dir = tmp_path / "temp" / "chunks" / upload_id
+    chunks_dir.mkdir(parents=True)
+    (chunks_dir / "chunk_0").write_bytes(b"accepted")
+
+    service = FileService()
+    session = {"status": UploadStatus.IN_PROGRESS, "total_chunks": 2}
+    with patch.object(service.file_repository, "get_chunked_upload", new_callable=AsyncMock, return_value=session), \
+         patch.object(service.file_repository, "add_received_chunk", new_callable=AsyncMock, return_value=None):
+        with pytest.raises(FileException):
+            await service.upload_chunk(upload_id, 0, UploadFile(filename="chunk", file=io.BytesIO(b"retry")))
+
+    assert (chunks_dir / "chunk_0").read_bytes() == b"accepted"
+    assert os.listdir(chunks_dir) == ["chunk_0"]
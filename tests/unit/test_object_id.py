@@ -0,0 +1,21 @@
+import pytest
+from bson import ObjectId # type: ignore
+
+from app.utils.object_id import is_valid_object_id
+
+pytestmark = [pytest.mark.unit]
+
+@pytest.mark.parametrize("value", [
+    "64b7f0c2a1b2c3d4e5f60718",
+    "64B7F0C2A1B2C3D4E5F60718",
+    ObjectId(),
+    "",
+    "not-an-id",
+    "64b7f0c2a1b2c3d4e5f6071",
+    "64b7f0c2a1b2c3d4e5f60718\n",
+    None,
+    12345,
+])
+def test_is_valid_object_id_matches_bson(value):
+    """Test that the regex check agrees with ObjectId.is_valid."""
+    assert is_valid_object_id(value) == ObjectId.is_valid(value)
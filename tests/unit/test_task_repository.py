@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.routers.task import task_repository
+from app.routers.task.task_repository import TaskRepository
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+@pytest.fixture(autouse=True)
+def empty_list_cache():
+    """Start every test with an empty task list cache."""
+    task_repository._invalidate_task_lists()
+    yield
+    task_repository._invalidate_task_lists()
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_serves_cached_page():
+    """Test that a fresh cached page is returned without querying again."""
+    page = ([{"_id": "1"}], 1, None)
+    with patch.object(TaskRepository, "_load_task_list", new_callable=AsyncMock, return_value=page) as load:
+        repository = TaskRepository()
+        assert await repository.get_all_tasks(1, 10) == page
+        assert await repository.get_all_tasks(1, 10) == page
+
+    load.assert_awaited_once_with(1, 10, None)
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_refreshes_stale_page_in_background():
+    """Test that a stale page is served immediately while it is reloaded."""
+    old_page = ([{"_id": "1"}], 1, None)
+    new_page = ([{"_id": "2"}, {"_id": "1"}], 2, None)
+    with patch.object(TaskRepository, "_load_task_list", new_callable=AsyncMock, side_effect=[old_page, new_page]), \
+         patch.object(task_repository.settings, "TASK_LIST_CACHE_FRESH_SECONDS", -1):
+        repository = TaskRepository()
+        await repository.get_all_tasks(1, 10)
+        assert await repository.get_all_tasks(1, 10) == old_page
+        await asyncio.sleep(0)
+        assert await repository.get_all_tasks(1, 10) == new_page
+
+@pytest.mark.asyncio
+async def test_task_write_clears_list_cache():
+    """Test that invalidating a task drops every cached list page."""
+    page = ([{"_id": "1"}], 1, None)
+    with patch.object(TaskRepository, "_load_task_list", new_callable=AsyncMock, return_value=page) as load:
+        repository = TaskRepository()
+        await repository.get_all_tasks(1, 10)
+        repository.invalidate_cache("1")
+        await repository.get_all_tasks(1, 10)
+
+    assert load.await_count == 2
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_query():
+    """Test that concurrent reads of an uncached page or task hit the database once."""
+    page = ([{"_id": "1"}], 1, None)
+    task_id = "64b7f0c2a1b2c3d4e5f60718"
+    with patch.object(TaskRepository, "_load_task_list", new_callable=AsyncMock, return_value=page) as load_list, \
+         patch.object(task_repository, "_fetch_tasks", new_callable=AsyncMock, return_value={task_id: {"_id": task_id}}) as fetch_tasks:
+        repository = TaskRepository()
+        pages = await asyncio.gather(*[repository.get_all_tasks(1, 10) for _ in range(5)])
+        tasks = await asyncio.gather(*[repository.get_task_by_id(task_id) for _ in range(5)])
+        repository.invalidate_cache(task_id)
+
+    assert pages == [page] * 5
+    assert tasks == [{"_id": task_id}] * 5
+    load_list.assert_awaited_once()
+    fetch_tasks.assert_awaited_once_with([task_id])
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_of_different_tasks_are_batched():
+    """Test that uncached tasks requested together are read with one query."""
+    task_ids = ["64b7f0c2a1b2c3d4e5f6071" + digit for digit in "abc"]
+    found = {task_id: {"_id": task_id} for task_id in task_ids[:2]}
+    with patch.object(task_repository, "_fetch_tasks", new_callable=AsyncMock, return_value=found) as fetch_tasks:
+        repository = TaskRepository()
+        tasks = await asyncio.gather(*[repository.get_task_by_id(task_id) for task_id in task_ids])
+        for task_id in task_ids:
+            repository.invalidate_cache(task_id)
+
+    assert tasks == [{"_id": task_ids[0]}, {"_id": task_ids[1]}, None]
+    fetch_tasks.assert_awaited_once_with(task_ids)
+
+@pytest.mark.asyncio
+async def test_get_task_by_id_accepts_uppercase_id():
+    """Test that an uppercase id finds the task keyed by its lowercase str(ObjectId)."""
+    task_id = "64b7f0c2a1b2c3d4e5f6071a"
+    with patch.object(task_repository, "_fetch_tasks", new_callable=AsyncMock, return_value={task_id: {"_id": task_id}}) as fetch_tasks:
+        repository = TaskRepository()
+        task = await repository.get_task_by_id(task_id.upper())
+        cached = await repository.get_task_by_id(task_id)
+        repository.invalidate_cache(task_id.upper())
+
+    assert task == cached == {"_id": task_id}
+    fetch_tasks.assert_awaited_once_with([task_id])
+    assert task_repository._task_cache.get(task_id) is None
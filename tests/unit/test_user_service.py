@@ -0,0 +1,304 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from fastapi import BackgroundTasks
+
+from app.exceptions import UserException
+from app.routers.user.user_model import UserCreate, UserUpdate, VerifyEmailRequest, ResetPasswordRequest, ForgotPasswordRequest
+from app.routers.user.user_repository import hash_token
+from app.routers.user.user_service import UserService
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+@pytest_asyncio.fixture
+async def users_db(mock_db):
+    """Point the user repository at the mock database."""
+    async def mock_get_collection(collection_name: str):
+        return mock_db[collection_name]
+
+    await mock_db.users.delete_many({})
+    # mongomock reports the first unique index on update conflicts, so the
+    # email index (the only unique field UserUpdate can change) comes first
+    await mock_db.users.create_index("email", unique=True)
+    await mock_db.users.create_index("username", unique=True)
+
+    with patch("app.routers.user.user_repository.get_collection", side_effect=mock_get_collection):
+        yield mock_db
+
+async def _insert_user(db, username: str, email: str) -> str:
+    result = await db.users.insert_one({
+        "username": username,
+        "email": email,
+        "password": "hashed",
+        "first_name": username,
+        "last_name": "Test",
+        "middle_name": "",
+        "roles": ["user"],
+        "is_active": True
+    })
+    return str(result.inserted_id)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("username,email,detail", [
+    ("alice", "new@example.com", "Username already exists"),
+    ("newbie", "alice@example.com", "Email already exists"),
+])
+async def test_create_user_duplicate(users_db, username, email, detail):
+    """Test that a unique index violation on insert reports the conflicting field."""
+    await _insert_user(users_db, "alice", "alice@example.com")
+
+    with pytest.raises(UserException) as exc_info:
+        await UserService().create_user(UserCreate(username=username, email=email, first_name="New", last_name="User"), "admin")
+
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == detail
+
+@pytest.mark.asyncio
+async def test_update_user_returns_updated_document(users_db):
+    """Test that update_user returns the post-update document and leaves unsent fields alone."""
+    user_id = await _insert_user(users_db, "alice", "alice@example.com")
+    await users_db.users.update_one({"username": "alice"}, {"$set": {"password_reset_token": "digest"}})
+
+    result = await UserService().update_user(user_id, UserUpdate(first_name="Alicia"), "admin")
+
+    assert result["_id"] == user_id
+    assert result["first_name"] == "Alicia"
+    assert result["email"] == "alice@example.com"
+    assert result["updated_by"] == "admin"
+    assert "password" not in result
+    assert "password_reset_token" not in result
+
+@pytest.mark.asyncio
+async def test_update_user_duplicate_email(users_db):
+    """Test that a unique index violation is reported as a 400."""
+    await _insert_user(users_db, "alice", "alice@example.com")
+    bob_id = await _insert_user(users_db, "bob", "bob@example.com")
+
+    with pytest.raises(UserException) as exc_info:
+        await UserService().update_user(bob_id, UserUpdate(email="alice@example.com"), "admin")
+
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "Email already exists"
+
+@pytest.mark.asyncio
+async def test_update_user_not_found(users_db):
+    """Test that updating a missing user raises a 404."""
+    with pytest.raises(UserException) as exc_info:
+        await UserService().update_user("64b7f0c2a1b2c3d4e5f60718", UserUpdate(first_name="Ghost"), "admin")
+
+    assert exc_info.value.status_code == 404
+
+@pytest.mark.asyncio
+async def test_verify_email_consumes_token_once(users_db):
+    """Test that a verification token sets the password and cannot be reused."""
+    await _insert_user(users_db, "alice", "alice@example.com")
+    await users_db.users.update_one({"username": "alice"}, {"$set": {
+        "is_verify_email": False,
+        "email_verification_token": hash_token("token-1"),
+        "email_verification_expires": datetime.utcnow() + timedelta(hours=1)
+    }})
+    request = VerifyEmailRequest(token="token-1", password="Secret123!", confirm_password="Secret123!")
+
+    result = await UserService().verify_email_with_password(request)
+    assert result["status"] == "verified"
+
+    user = await users_db.users.find_one({"username": "alice"})
+    assert user["is_verify_email"] is True
+    assert "email_verification_token" not in user
+    assert user["password"] != "hashed"
+
+    with pytest.raises(UserException) as exc_info:
+        await UserService().verify_email_with_password(request)
+    assert exc_info.value.detail == "Invalid verification token"
+
+@pytest.mark.asyncio
+async def test_verify_email_expired_token(users_db):
+    """Test that an expired token is reported as expired."""
+    await _insert_user(users_db, "alice", "alice@example.com")
+    await users_db.users.update_one({"username": "alice"}, {"$set": {
+        "is_verify_email": False,
+        "email_verification_token": "token-1",
+        "email_verification_expires": datetime.utcnow() - timedelta(hours=1)
+    }})
+    request = VerifyEmailRequest(token="token-1", password="Secret123!", confirm_password="Secret123!")
+
+    with pytest.raises(UserException) as exc_info:
+        await UserService().verify_email_with_password(request)
+    assert exc_info.value.detail == "Verification token has expired"
+
+@pytest.mark.asyncio
+async def test_bulk_resend_verification(users_db):
+    """Test that tokens are refreshed in bulk and verified users are skipped."""
+    alice_id = await _insert_user(users_db, "alice", "alice@example.com")
+    bob_id = await _insert_user(users_db, "bob", "bob@example.com")
+    await users_db.users.update_one({"username": "bob"}, {"$set": {"is_verify_email": True}})
+
+    service = UserService()
+    with patch.object(UserService, "send_account_setup_emails_bulk", return_value=1) as send_emails:
+        result = await service.bulk_resend_verification([alice_id, bob_id])
+
+    assert result == {"sent": 1, "failed": 0, "skipped": 1}
+    alice = await users_db.users.find_one({"username": "alice"})
+    [(email, token, name)] = send_emails.call_args.args[0]
+    assert (email, name) == ("alice@example.com", "alice")
+    assert alice["email_verification_token"] == hash_token(token)
+    assert alice["email_verification_expires"] > datetime.utcnow()
+
+@pytest.mark.asyncio
+async def test_get_all_users_keyset_pagination(users_db):
+    """Test that next_cursor continues the listing without overlap."""
+    for name in ["alice", "bob", "carol"]:
+        await _insert_user(users_db, name, f"{name}@example.com")
+
+    service = UserService()
+    first = await service.get_all_users(limit=2)
+    second = await service.get_all_users(limit=2, after_id=first["next_cursor"])
+
+    assert [user["username"] for user in first["list"]] == ["carol", "bob"]
+    assert [user["username"] for user in second["list"]] == ["alice"]
+    assert second["next_cursor"] is None
+    assert first["total"] == 3
+
+@pytest.mark.asyncio
+async def test_get_all_users_omits_login_history(users_db):
+    """Test that the user list leaves out login_history while get_user keeps it."""
+    user_id = await _insert_user(users_db, "alice", "alice@example.com")
+    await users_db.users.update_one({"username": "alice"}, {"$set": {"login_history": [{"ip_address": "127.0.0.1"}]}})
+
+    service = UserService()
+    listed = await service.get_all_users()
+
+    assert "login_history" not in listed["list"][0]
+    assert (await service.get_user(user_id))["login_history"] == [{"ip_address": "127.0.0.1"}]
+
+@pytest.mark.asyncio
+async def test_get_user_excludes_sensitive_fields(users_db):
+    """Test that get_user never returns the password hash or tokens."""
+    user_id = await _insert_user(users_db, "alice", "alice@example.com")
+    await users_db.users.update_one({"username": "alice"}, {"$set": {"email_verification_token": "token-1"}})
+
+    user = await UserService().get_user(user_id)
+
+    assert user["username"] == "alice"
+    assert "password" not in user
+    assert "email_verification_token" not in user
+
+@pytest.mark.asyncio
+async def test_get_user_invalid_id():
+    """Test that a malformed user_id is rejected before any query."""
+    with pytest.raises(UserException) as exc_info:
+        await UserService().get_user("not-an-id")
+
+    assert exc_info.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_reset_password_expired_token(users_db):
+    """Test that an expired reset token is rejected without parsing the expiry in Python."""
+    await _insert_user(users_db, "alice", "alice@example.com")
+    await users_db.users.update_one({"username": "alice"}, {"$set": {
+        "password_reset_token": hash_token("reset-1"),
+        "password_reset_expires": datetime.utcnow() - timedelta(minutes=1)
+    }})
+    request = ResetPasswordRequest(token="reset-1", password="Secret123!", confirm_password="Secret123!")
+
+    with pytest.raises(UserException) as exc_info:
+        await UserService().reset_password(request)
+    assert exc_info.value.detail == "Reset token has expired"
+
+@pytest.mark.asyncio
+async def test_find_by_id_with_fields(users_db):
+    """Test that a field list fetches only those fields and an empty list only the _id."""
+    user_id = await _insert_user(users_db, "alice", "alice@example.com")
+    repository = UserService().user_repository
+
+    assert await repository.find_by_id(user_id, fields=("email",)) == {"_id": user_id, "email": "alice@example.com"}
+    assert await repository.find_by_id(user_id, include_password=True, fields=()) == {"_id": user_id, "password": "hashed"}
+
+@pytest.mark.asyncio
+async def test_resend_verification_email(users_db):
+    """Test that resend stores a new token, defers the email and rejects verified users."""
+    alice_id = await _insert_user(users_db, "alice", "alice@example.com")
+    bob_id = await _insert_user(users_db, "bob", "bob@example.com")
+    await users_db.users.update_one({"username": "bob"}, {"$set": {"is_verify_email": True}})
+
+    service = UserService()
+    background_tasks = BackgroundTasks()
+    result = await service.resend_verification_email(alice_id, background_tasks)
+    assert result["message"] == "Verification email queued"
+
+    with pytest.raises(UserException) as exc_info:
+        await service.resend_verification_email(bob_id, background_tasks)
+    assert exc_info.value.detail == "Email is already verified"
+
+    # The email is sent after the response, not awaited inline
+    [task] = background_tasks.tasks
+    email, token, name = task.args
+    alice = await users_db.users.find_one({"username": "alice"})
+    assert (email, name) == ("alice@example.com", "alice")
+    assert alice["email_verification_token"] == hash_token(token)
+
+@pytest.mark.asyncio
+async def test_forgot_password_pads_unknown_email(users_db):
+    """Test that an unknown email waits out the average known-email duration."""
+    with patch("app.routers.user.user_service._forgot_password_seconds", 5.0), \
+         patch("app.routers.user.user_service.asyncio.sleep") as sleep:
+        result = await UserService().forgot_password(ForgotPasswordRequest(email="ghost@example.com"))
+
+    assert "password reset link" in result["message"]
+    assert 4.0 < sleep.call_args.args[0] <= 5.0
+
+@pytest.mark.asyncio
+async def test_repository_update_user_keeps_operators(users_db):
+    """Test that update_user applies every update operator, not only $set."""
+    user_id = await _insert_user(users_db, "alice", "alice@example.com")
+    repository = UserService().user_repository
+
+    result = await repository.update_user(user_id, {
+        "$set": {"last_login_ip": "127.0.0.1"},
+        "$push": {"login_history": {"ip_address": "127.0.0.1"}}
+    }, user_id)
+
+    user = await users_db.users.find_one({"username": "alice"})
+    assert result is not None
+    assert user["last_login_ip"] == "127.0.0.1"
+    assert user["login_history"] == [{"ip_address": "127.0.0.1"}]
+    assert user["updated_by"] == user_id
+
+@pytest.mark.asyncio
+async def test_delete_user_returns_deleted_user(users_db):
+    """Test that delete_user removes the user in one call and 404s once it is gone."""
+    user_id = await _insert_user(users_db, "alice", "alice@example.com")
+    service = UserService()
+
+    deleted = await service.delete_user(user_id)
+    assert deleted["username"] == "alice"
+    assert "password" not in deleted
+    assert await users_db.users.count_documents({}) == 0
+
+    with pytest.raises(UserException) as exc_info:
+        await service.delete_user(user_id)
+    assert exc_info.value.status_code == 404
+
+@pytest.mark.asyncio
+async def test_verify_email_invalid_token_skips_hashing(users_db):
+    """Test that an unknown token is rejected before the password is hashed."""
+    request = VerifyEmailRequest(token="bogus", password="Secret123!", confirm_password="Secret123!")
+
+    with patch("app.routers.user.user_service.run_password_hash") as run_password_hash:
+        with pytest.raises(UserException) as exc_info:
+            await UserService().verify_email_with_password(request)
+
+    assert exc_info.value.detail == "Invalid verification token"
+    run_password_hash.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_find_by_id_uppercase_id_is_invalidated(users_db):
+    """Test that a user read by an uppercase id is evicted when the user is updated."""
+    user_id = await _insert_user(users_db, "alice", "alice@example.com")
+    service = UserService()
+
+    assert (await service.user_repository.find_by_id(user_id.upper()))["first_name"] == "alice"
+    await service.update_user(user_id, UserUpdate(first_name="Alicia"), "admin")
+
+    assert (await service.user_repository.find_by_id(user_id.upper()))["first_name"] == "Alicia"